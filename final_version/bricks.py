@@ -0,0 +1,184 @@
+import copy
+import pygame
+from array import array
+
+# -- Brick storage --
+# Bricks are kept as parallel arrays (x, y, width, height, palette index) plus
+# an alive mask instead of a list of Brick objects. Destroying a brick only
+# clears its alive byte and decrements the live counter, so nothing is ever
+# shifted and "level cleared" is a single comparison.
+class BrickStore:
+    def __init__(self, xs, ys, widths, heights, color_ids, palette, alive=None, live_count=None):
+        self.xs = xs
+        self.ys = ys
+        self.widths = widths
+        self.heights = heights
+        self.color_ids = color_ids
+        self.palette = palette
+        self.alive = alive if alive is not None else bytearray(b'\x01' * len(xs))
+        self.live_count = live_count if live_count is not None else sum(self.alive)
+        self.version = 0  # Bumped on every kill so caches can tell the store changed
+
+    @classmethod
+    def from_bricks(cls, bricks):
+        palette = []
+        xs, ys, widths, heights = array('h'), array('h'), array('h'), array('h')
+        color_ids = array('B')
+        for brick in bricks:
+            if brick.color not in palette:
+                palette.append(brick.color)
+            xs.append(brick.rect.x)
+            ys.append(brick.rect.y)
+            widths.append(brick.rect.width)
+            heights.append(brick.rect.height)
+            color_ids.append(palette.index(brick.color))
+        return cls(xs, ys, widths, heights, color_ids, palette)
+
+    def __len__(self):
+        return self.live_count
+
+    def kill(self, index):
+        if self.alive[index]:
+            self.alive[index] = 0
+            self.live_count -= 1
+            self.version += 1
+
+    def indices(self):
+        return [i for i, is_alive in enumerate(self.alive) if is_alive]
+
+    def rect(self, index):
+        return pygame.Rect(self.xs[index], self.ys[index], self.widths[index], self.heights[index])
+
+    def center(self, index):
+        return (self.xs[index] + self.widths[index] // 2, self.ys[index] + self.heights[index] // 2)
+
+    def color(self, index):
+        return self.palette[self.color_ids[index]]
+
+    def collides(self, index, rect):
+        # Same test as pygame.Rect.colliderect, without building a Rect
+        x = self.xs[index]
+        y = self.ys[index]
+        return (rect.left < x + self.widths[index] and x < rect.right and
+                rect.top < y + self.heights[index] and y < rect.bottom)
+
+    def draw(self, screen):
+        for i in self.indices():
+            pygame.draw.rect(screen, self.color(i), self.rect(i))
+
+
+# -- Brick spatial index --
+# Every create_*_wall function lays bricks out on an 80x25 pitch starting at
+# y = 50, so a uniform grid with that cell size puts almost every brick in a
+# single cell. Bricks that sit off the grid (the pyramid's odd rows, the wave
+# wall) are simply registered in every cell they overlap.
+CELL_WIDTH = 80
+CELL_HEIGHT = 25
+GRID_ORIGIN_Y = 50
+
+
+class BrickGrid:
+    def __init__(self, store, cell_width=CELL_WIDTH, cell_height=CELL_HEIGHT, origin_y=GRID_ORIGIN_Y):
+        self.store = store
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.origin_y = origin_y
+        self.cells = {}  # (col, row) -> indices of the bricks overlapping that cell
+        for i in range(len(store.xs)):
+            for cell in self._cells_for(store.rect(i)):
+                self.cells.setdefault(cell, []).append(i)
+
+    def with_store(self, store):
+        # A grid for another store with the same layout (a copy, a restored
+        # snapshot), sharing the buckets instead of rebuilding them
+        grid = copy.copy(self)
+        grid.store = store
+        return grid
+
+    def _cells_for(self, rect):
+        first_col = rect.left // self.cell_width
+        last_col = (rect.right - 1) // self.cell_width
+        first_row = (rect.top - self.origin_y) // self.cell_height
+        last_row = (rect.bottom - 1 - self.origin_y) // self.cell_height
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                yield (col, row)
+
+    def sweep(self, rect, dx, dy):
+        # Continuous collision for a box moving from rect by (dx, dy) this
+        # frame. Returns (time, index, axis) for every live brick the motion
+        # segment enters, earliest first, where time is the fraction of the
+        # move at first contact and axis ('x' or 'y') is the side that was hit.
+        # Only the cells under the swept box are tested, like first_hit.
+        store = self.store
+        alive = store.alive
+        swept = rect.union(rect.move(dx, dy))
+        seen = set()
+        hits = []
+        for cell in self._cells_for(swept):
+            for i in self.cells.get(cell, ()):
+                if not alive[i] or i in seen:
+                    continue
+                seen.add(i)
+                hit = self._time_of_impact(rect, dx, dy, i)
+                if hit is not None:
+                    hits.append((hit[0], i, hit[1]))
+        hits.sort()
+        return hits
+
+    def _time_of_impact(self, rect, dx, dy, index):
+        store = self.store
+        entry, exit, axis = box_entry(rect, dx, dy, store.xs[index], store.ys[index],
+                                      store.widths[index], store.heights[index])
+        if entry >= exit or entry >= 1 or exit <= 0:
+            return None
+        return max(entry, 0.0), axis
+
+    def earliest_contact(self, rect, dx, dy):
+        # Earliest time, in whole (dx, dy) moves, at which a box moving in a
+        # straight line from rect starts to overlap any live brick, or None.
+        # Used to skip ahead to the next brick contact, so every brick is
+        # tested rather than only the cells under a single move.
+        store = self.store
+        earliest = None
+        for i in store.indices():
+            entry, exit, _ = box_entry(rect, dx, dy, store.xs[i], store.ys[i],
+                                       store.widths[i], store.heights[i])
+            if entry < exit and exit > 0 and (earliest is None or entry < earliest):
+                earliest = entry
+        return earliest
+
+    def first_hit(self, rect):
+        # Same answer as scanning every brick in build order and stopping at
+        # the first collision, but only the cells under rect are tested.
+        # Dead bricks stay in their buckets and are skipped via the alive mask.
+        store = self.store
+        alive = store.alive
+        hit = None
+        for cell in self._cells_for(rect):
+            for i in self.cells.get(cell, ()):
+                if alive[i] and (hit is None or i < hit) and store.collides(i, rect):
+                    hit = i
+        return hit
+
+
+def box_entry(rect, dx, dy, x, y, width, height):
+    # Slab test of a box moving from rect by (dx, dy) per unit of time against
+    # the target (x, y, width, height) grown by the box size. Returns the times
+    # at which the boxes start and stop overlapping, and the axis ('x' or 'y')
+    # of the side that was hit. They never overlap when entry >= exit.
+    x_entry, x_exit = _slab(rect.left, dx, x - rect.width, x + width)
+    y_entry, y_exit = _slab(rect.top, dy, y - rect.height, y + height)
+    axis = 'x' if x_entry > y_entry else 'y'
+    return max(x_entry, y_entry), min(x_exit, y_exit), axis
+
+def _slab(start, delta, low, high):
+    # Interval of move fractions during which start + delta * t is strictly
+    # inside (low, high)
+    if delta == 0:
+        if low < start < high:
+            return float('-inf'), float('inf')
+        return float('inf'), float('-inf')
+    t1 = (low - start) / delta
+    t2 = (high - start) / delta
+    return (t1, t2) if t1 < t2 else (t2, t1)
@@ -1,10 +1,18 @@
 import pygame
 import random
-import math
+from collections import OrderedDict
+import numpy as np
 
-# Initialize the font module for the power-up letters
-pygame.font.init()
-POWERUP_FONT = pygame.font.Font(None, 20)
+# Font for the power-up letters, created on first draw so that headless
+# sessions never need to initialise the font module
+POWERUP_FONT = None
+
+def get_powerup_font():
+    global POWERUP_FONT
+    if POWERUP_FONT is None:
+        pygame.font.init()
+        POWERUP_FONT = pygame.font.Font(None, 20)
+    return POWERUP_FONT
 
 class Paddle:
     def __init__(self, screen_width, screen_height):
@@ -16,11 +24,13 @@ class Paddle:
         self.color = (200, 200, 200)
         
         self.width = self.original_width
-        self.power_up_timers = {
+        # Session tick at which each power-up wears off, 0 when inactive
+        # (see scheduler.TimerQueue)
+        self.power_up_ends = {
             'grow': 0,
             'laser': 0,
             'glue': 0,
-            'shrink': 0  # Add timer for shrink power-up
+            'shrink': 0
         }
         self.has_laser = False
         self.has_glue = False
@@ -32,109 +42,93 @@ class Paddle:
             self.width,
             self.height
         )
+        self.prev_position = self.rect.topleft  # Where the last update started
 
     def reset(self):
         self.rect.x = self.screen_width // 2 - self.original_width // 2
         self.width = self.original_width
         self.rect.width = self.width
+        self.prev_position = self.rect.topleft
         self.has_laser = False
         self.has_glue = False
         self.has_shrink = False  # Reset shrink state
-        for power_up in self.power_up_timers:
-            self.power_up_timers[power_up] = 0
+        for power_up in self.power_up_ends:
+            self.power_up_ends[power_up] = 0
 
-    def update(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
+    def update(self, move_left=False, move_right=False):
+        self.prev_position = self.rect.topleft
+        if move_left:
             self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT]:
+        if move_right:
             self.rect.x += self.speed
 
         if self.rect.left < 0:
             self.rect.left = 0
         if self.rect.right > self.screen_width:
             self.rect.right = self.screen_width
-            
-        self._update_power_ups()
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect)
+    def draw(self, screen, alpha=1.0):
+        return pygame.draw.rect(screen, self.color, interpolated_rect(self.rect, self.prev_position, alpha))
         
-    def activate_power_up(self, power_type):
+    def activate_power_up(self, power_type, now=0):
         # Store the current center position of the paddle
         current_center = self.rect.centerx
         
         if power_type == 'grow':
             self.width = min(self.width + 40, 200)  # Increase width but cap at 200
             self.rect.width = self.width
-            self.power_up_timers['grow'] = 600  # 10 seconds at 60 FPS
+            self.power_up_ends['grow'] = now + 600  # 10 seconds at 60 FPS
             
         elif power_type == 'laser':
             self.has_laser = True
-            self.power_up_timers['laser'] = 600
+            self.power_up_ends['laser'] = now + 600
             
         elif power_type == 'glue':
             self.has_glue = True
-            self.power_up_timers['glue'] = 600
+            self.power_up_ends['glue'] = now + 600
             
         elif power_type == 'shrink':
             self.width = max(self.width - 30, 50)  # Decrease width but not below 50
             self.rect.width = self.width
-            self.power_up_timers['shrink'] = 450  # 7.5 seconds
+            self.power_up_ends['shrink'] = now + 450  # 7.5 seconds
             self.has_shrink = True
         
         # Re-center the paddle after width change
         self.rect.centerx = current_center
             
-    def _update_power_ups(self):
-        # Grow power-up timer
-        if self.power_up_timers['grow'] > 0:
-            self.power_up_timers['grow'] -= 1
-            if self.power_up_timers['grow'] <= 0:
-                current_center = self.rect.centerx
-                self.width = self.original_width
-                self.rect.width = self.width
-                self.rect.centerx = current_center
-        
-        # Laser power-up timer
-        if self.power_up_timers['laser'] > 0:
-            self.power_up_timers['laser'] -= 1
-            if self.power_up_timers['laser'] <= 0:
-                self.has_laser = False
-        
-        # Glue power-up timer
-        if self.power_up_timers['glue'] > 0:
-            self.power_up_timers['glue'] -= 1
-            if self.power_up_timers['glue'] <= 0:
-                self.has_glue = False
-                
-        # Shrink power-up timer
-        if self.power_up_timers['shrink'] > 0:
-            self.power_up_timers['shrink'] -= 1
-            if self.power_up_timers['shrink'] <= 0:
+    def expire_power_up(self, power_type):
+        self.power_up_ends[power_type] = 0
+        if power_type == 'laser':
+            self.has_laser = False
+        elif power_type == 'glue':
+            self.has_glue = False
+        else:
+            # Grow and shrink both end with the original width
+            if power_type == 'shrink':
                 self.has_shrink = False
-                current_center = self.rect.centerx
-                self.width = self.original_width
-                self.rect.width = self.width
-                self.rect.centerx = current_center
+            current_center = self.rect.centerx
+            self.width = self.original_width
+            self.rect.width = self.width
+            self.rect.centerx = current_center
 
 
 class Ball:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, rng=random):
         self.screen_width = screen_width
+        self.rng = rng  # Launch directions, the session's gameplay stream
         self.screen_height = screen_height
         self.radius = 10
         self.color = (200, 200, 200)
         self.rect = pygame.Rect(0, 0, self.radius * 2, self.radius * 2)
+        self.prev_position = self.rect.topleft  # Where the last update started
         
         self.is_glued = False
         self.is_slowed = False
         self.is_fast = False    # Add fast state tracking
         self.is_strong = False  # Add strong state tracking
         
-        self.slow_timer = 0
-        self.fast_timer = 0     # Add fast timer
-        self.strong_timer = 0   # Add strong timer
+        # Session tick at which each power-up wears off, 0 when inactive
+        self.power_up_ends = {'slow': 0, 'fast': 0, 'strong': 0}
         
         self.base_speed = 6
         
@@ -142,33 +136,16 @@ class Ball:
 
     def reset(self):
         self.rect.center = (self.screen_width // 2, self.screen_height // 2)
-        self.speed_x = self.base_speed * random.choice((1, -1))
+        self.speed_x = self.base_speed * self.rng.choice((1, -1))
         self.speed_y = -self.base_speed
         self.is_glued = False
         self.is_slowed = False
         self.is_fast = False
         self.is_strong = False
-        self.slow_timer = 0
-        self.fast_timer = 0
-        self.strong_timer = 0
+        self.power_up_ends = {'slow': 0, 'fast': 0, 'strong': 0}
 
     def update(self, paddle, launch_ball=False):
-        # Handle power-up timers
-        if self.is_slowed:
-            self.slow_timer -= 1
-            if self.slow_timer <= 0:
-                self.is_slowed = False
-        
-        if self.is_fast:
-            self.fast_timer -= 1
-            if self.fast_timer <= 0:
-                self.is_fast = False
-                
-        if self.is_strong:
-            self.strong_timer -= 1
-            if self.strong_timer <= 0:
-                self.is_strong = False
-        
+        self.prev_position = self.rect.topleft
         collision_object = None
 
         if self.is_glued:
@@ -176,7 +153,7 @@ class Ball:
             self.rect.bottom = paddle.rect.top
             if launch_ball:
                 self.is_glued = False
-                self.speed_x = self.base_speed * random.choice((1, -1))
+                self.speed_x = self.base_speed * self.rng.choice((1, -1))
                 self.speed_y = -self.base_speed
             return 'playing', None
 
@@ -213,7 +190,7 @@ class Ball:
         
         return 'playing', collision_object
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         # Change color based on power-ups
         color = self.color
         if self.is_strong:
@@ -223,20 +200,29 @@ class Ball:
         elif self.is_slowed:
             color = (100, 100, 255) # Blue for slow ball
             
-        pygame.draw.ellipse(screen, color, self.rect)
+        return pygame.draw.ellipse(screen, color, interpolated_rect(self.rect, self.prev_position, alpha))
         
-    def activate_power_up(self, power_type):
+    def activate_power_up(self, power_type, now=0):
         if power_type == 'slow':
             self.is_slowed = True
             self.is_fast = False  # Cancel fast if active
-            self.slow_timer = 600  # 10 seconds at 60 FPS
+            self.power_up_ends['slow'] = now + 600  # 10 seconds at 60 FPS
         elif power_type == 'fast':
             self.is_fast = True
             self.is_slowed = False  # Cancel slow if active
-            self.fast_timer = 600  # 10 seconds
+            self.power_up_ends['fast'] = now + 600  # 10 seconds
         elif power_type == 'strong':
             self.is_strong = True
-            self.strong_timer = 900  # 15 seconds
+            self.power_up_ends['strong'] = now + 900  # 15 seconds
+
+    def expire_power_up(self, power_type):
+        self.power_up_ends[power_type] = 0
+        if power_type == 'slow':
+            self.is_slowed = False
+        elif power_type == 'fast':
+            self.is_fast = False
+        elif power_type == 'strong':
+            self.is_strong = False
 
 
 class Brick:
@@ -269,19 +255,36 @@ class PowerUp:
         self.width = 30
         self.height = 15
         self.rect = pygame.Rect(x, y, self.width, self.height)
+        self.prev_position = self.rect.topleft
         self.speed_y = 3
         self.type = type
         self.color = self.PROPERTIES[type]['color']
         self.char = self.PROPERTIES[type]['char']
 
     def update(self):
+        self.prev_position = self.rect.topleft
         self.rect.y += self.speed_y
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect)
-        text_surf = POWERUP_FONT.render(self.char, True, (255, 255, 255))
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        screen.blit(text_surf, text_rect)
+    def draw(self, screen, alpha=1.0):
+        return screen.blit(get_powerup_sprite(self.type, self.width, self.height),
+                           interpolated_rect(self.rect, self.prev_position, alpha))
+
+
+# A capsule only depends on its type, so each one is baked into a sprite the
+# first time it is drawn and falling capsules cost a single blit
+POWERUP_SPRITES = {}
+
+def get_powerup_sprite(type, width, height):
+    key = (type, width, height)
+    sprite = POWERUP_SPRITES.get(key)
+    if sprite is None:
+        properties = PowerUp.PROPERTIES[type]
+        sprite = pygame.Surface((width, height))
+        sprite.fill(properties['color'])
+        text_surf = get_powerup_font().render(properties['char'], True, (255, 255, 255))
+        sprite.blit(text_surf, text_surf.get_rect(center=sprite.get_rect().center))
+        POWERUP_SPRITES[key] = sprite
+    return sprite
 
 
 class Laser:
@@ -289,37 +292,135 @@ class Laser:
         self.width = 5
         self.height = 15
         self.rect = pygame.Rect(x, y, self.width, self.height)
+        self.prev_position = self.rect.topleft
         self.color = (255, 255, 0)
         self.speed_y = -8
 
     def update(self):
+        self.prev_position = self.rect.topleft
         self.rect.y += self.speed_y
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect)
+    def draw(self, screen, alpha=1.0):
+        return pygame.draw.rect(screen, self.color, interpolated_rect(self.rect, self.prev_position, alpha))
+
+
+def interpolated_rect(rect, prev_position, alpha):
+    # Where to draw an object a fraction alpha of the way from where its
+    # last update started to where it is now (see scheduler.FixedStep)
+    if alpha >= 1:
+        return rect
+    start_x, start_y = prev_position
+    return pygame.Rect(round(start_x + (rect.x - start_x) * alpha),
+                       round(start_y + (rect.y - start_y) * alpha), rect.width, rect.height)
 
 # !!! PHASE: VISUAL EFFECTS !!!
-class Particle:
-    def __init__(self, x, y, color, min_size, max_size, min_speed, max_speed, gravity):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = random.randint(min_size, max_size)
-        self.gravity = gravity
-        angle = random.uniform(0, 360)
-        speed = random.uniform(min_speed, max_speed)
-        self.vx = speed * math.cos(math.radians(angle))
-        self.vy = speed * math.sin(math.radians(angle))
+class ParticleSystem:
+    # All sparks live in flat NumPy arrays (structure of arrays), so updating
+    # and culling them is a handful of vectorized operations no matter how
+    # many there are. Dead particles are dropped by compacting the live ones
+    # to the front of the arrays.
+    def __init__(self, capacity=256, rng=None):
+        self.count = 0
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old_count = self.count
+        arrays = {
+            'x': np.zeros(capacity, np.float32),
+            'y': np.zeros(capacity, np.float32),
+            'vx': np.zeros(capacity, np.float32),
+            'vy': np.zeros(capacity, np.float32),
+            'size': np.zeros(capacity, np.float32),
+            'gravity': np.zeros(capacity, np.float32),
+            'color': np.zeros((capacity, 3), np.uint8),
+        }
+        for name, array in arrays.items():
+            if old_count:
+                array[:old_count] = getattr(self, name)[:old_count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def seed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def emit(self, count, x, y, color, min_size, max_size, min_speed, max_speed, gravity):
+        if self.count + count > self.capacity:
+            self._allocate(max(self.capacity * 2, self.count + count))
+        start = self.count
+        end = start + count
+        angle = np.radians(self.rng.uniform(0, 360, count))
+        speed = self.rng.uniform(min_speed, max_speed, count)
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = speed * np.cos(angle)
+        self.vy[start:end] = speed * np.sin(angle)
+        self.size[start:end] = self.rng.integers(min_size, max_size + 1, count)
+        self.gravity[start:end] = gravity
+        self.color[start:end] = color
+        self.count = end
 
     def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += self.gravity
-        self.size -= 0.1 # Particles shrink over time
+        n = self.count
+        if not n:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += self.gravity[:n]
+        self.size[:n] -= 0.1  # Particles shrink over time
+
+        alive = self.size[:n] > 0
+        live_count = int(np.count_nonzero(alive))
+        if live_count < n:
+            for array in (self.x, self.y, self.vx, self.vy, self.size, self.gravity, self.color):
+                array[:live_count] = array[:n][alive]
+            self.count = live_count
 
     def draw(self, screen):
-        if self.size > 0:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.size))
+        # One pre-rendered circle per (color, radius) and a single blits()
+        # call for the whole system instead of a draw call per particle.
+        # Returns the rects that were drawn.
+        n = self.count
+        if not n:
+            return []
+        radii = self.size[:n].astype(np.int32)
+        xs = self.x[:n].astype(np.int32) - radii
+        ys = self.y[:n].astype(np.int32) - radii
+        colors = self.color[:n].astype(np.int32)
+        packed = (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+        return screen.blits([(get_particle_sprite(color, radius), (x, y))
+                             for color, radius, x, y in zip(packed.tolist(), radii.tolist(), xs.tolist(), ys.tolist())
+                             if radius > 0])
+
+
+# Pre-rendered particle circles keyed by (packed RGB color, radius). Brick
+# and bounce colors come back all the time, but explosions and fireworks use
+# random colors, so only the most recently used sprites are kept.
+PARTICLE_SPRITES = OrderedDict()
+PARTICLE_SPRITE_LIMIT = 256
+
+def get_particle_sprite(color, radius):
+    key = (color, radius)
+    sprite = PARTICLE_SPRITES.get(key)
+    if sprite is not None:
+        PARTICLE_SPRITES.move_to_end(key)
+    else:
+        rgb = ((color >> 16) & 255, (color >> 8) & 255, color & 255)
+        background = (255, 255, 255) if rgb == (0, 0, 0) else (0, 0, 0)
+        sprite = pygame.Surface((radius * 2, radius * 2))
+        sprite.fill(background)
+        pygame.draw.circle(sprite, rgb, (radius, radius), radius)
+        sprite.set_colorkey(background, pygame.RLEACCEL)
+        PARTICLE_SPRITES[key] = sprite
+        if len(PARTICLE_SPRITES) > PARTICLE_SPRITE_LIMIT:
+            PARTICLE_SPRITES.popitem(last=False)
+    return sprite
 
 class Firework:
     def __init__(self, screen_width, screen_height):
@@ -330,7 +431,7 @@ class Firework:
         self.vy = -random.uniform(8, 12) # Speed of the rocket
         self.color = (255, 255, 255) # White rocket
         self.exploded = False
-        self.particles = []
+        self.particles = ParticleSystem(64)
         self.explosion_y = random.uniform(screen_height * 0.2, screen_height * 0.5)
 
     def update(self):
@@ -339,21 +440,17 @@ class Firework:
             if self.y <= self.explosion_y:
                 self.exploded = True
                 explosion_color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
-                for _ in range(50): # Create 50 particles on explosion
-                    self.particles.append(Particle(self.x, self.y, explosion_color, 2, 4, 1, 4, 0.1))
+                # Create 50 particles on explosion
+                self.particles.emit(50, self.x, self.y, explosion_color, 2, 4, 1, 4, 0.1)
         else:
-            for particle in self.particles[:]:
-                particle.update()
-                if particle.size <= 0:
-                    self.particles.remove(particle)
+            self.particles.update()
 
     def draw(self, screen):
         if not self.exploded:
             pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), 3)
         else:
-            for particle in self.particles:
-                particle.draw(screen)
+            self.particles.draw(screen)
 
     def is_dead(self):
-        return self.exploded and not self.particles
+        return self.exploded and not len(self.particles)
 # !!! END PHASE: VISUAL EFFECTS !!!
\ No newline at end of file
@@ -0,0 +1,476 @@
+import random
+import math
+import struct
+import zlib
+from collections import namedtuple
+from game_objects import Paddle, Ball, PowerUp, Laser, ParticleSystem
+from levels import LEVELS, build_level
+from bricks import BrickStore, BrickGrid, box_entry
+from scheduler import TimerQueue
+from snapshot import take_snapshot, restore_snapshot, STATES
+
+# Input for a single frame: arrow keys and space held, F pressed this frame
+FrameInput = namedtuple('FrameInput', ['left', 'right', 'space', 'fire'], defaults=[False, False, False, False])
+NO_INPUT = FrameInput()
+
+BRICK_SCORE = 10
+# Particle bursts (count, max size and speed) by event source
+BOUNCE_PARTICLES = {'ball': (5, 3), 'extra_ball': (3, 2)}
+BRICK_PARTICLES = {'ball': (15, 4), 'laser': (10, 3)}
+BOUNCE_PARTICLE_COLOR = (255, 255, 0)
+
+# Layouts hashed by GameSession.state_hash()
+_HASH_HEAD = struct.Struct('<BBih')  # level, state, score, lives
+_HASH_PADDLE = struct.Struct('<5h3?4I')  # rect, width, laser/glue/shrink, power_up_ends
+_HASH_BALL = struct.Struct('<4h2d4?3I')  # rect, speed, glued/slowed/fast/strong, power_up_ends
+_HASH_POWER_UP = struct.Struct('<B2h')  # type, position
+_HASH_LASER = struct.Struct('<2h')  # position
+
+POWER_UP_TYPES = [
+    'grow', 'laser', 'glue', 'slow',  # Original power-ups
+    'multi', 'extra_life', 'strong',  # New positive power-ups
+    'fast', 'shrink'  # New negative power-ups
+]
+
+# --- Ball Reset Function ---
+def safe_reset_ball(ball, bricks, paddle):
+    # Reset the ball to appear just above the paddle
+    ball.rect.centerx = paddle.rect.centerx
+    ball.rect.bottom = paddle.rect.top - 5
+    ball.speed_x = ball.base_speed * ball.rng.choice((1, -1))
+    ball.speed_y = -ball.base_speed
+    ball.is_glued = True  # Start with the ball glued to the paddle
+    ball.is_slowed = False
+    ball.is_fast = False
+    ball.is_strong = False
+    ball.power_up_ends = dict.fromkeys(ball.power_up_ends, 0)
+    ball.prev_position = ball.rect.topleft  # Don't draw it sliding over from where it was lost
+
+# -- New function for creating a multi-ball --
+def create_multi_ball(main_ball):
+    new_ball = Ball(main_ball.screen_width, main_ball.screen_height, main_ball.rng)
+    new_ball.rect.centerx = main_ball.rect.centerx
+    new_ball.rect.centery = main_ball.rect.centery
+    # Give the new ball a random direction
+    angle = main_ball.rng.uniform(0.3, 0.7) * math.pi  # Random angle between 0.3π and 0.7π
+    new_ball.speed_x = main_ball.base_speed * math.cos(angle) * main_ball.rng.choice([-1, 1])
+    new_ball.speed_y = -main_ball.base_speed * math.sin(angle)
+    # Copy main ball's properties
+    new_ball.is_slowed = main_ball.is_slowed
+    new_ball.is_fast = main_ball.is_fast
+    new_ball.is_strong = main_ball.is_strong
+    new_ball.power_up_ends = main_ball.power_up_ends.copy()
+    new_ball.prev_position = new_ball.rect.topleft
+
+    return new_ball
+
+
+# The gameplay of a single game, with no window, sound or frame cap.
+# step() advances one frame and returns the events the caller may want
+# to react to (sounds, messages, state changes):
+#   ('bounce', source, x, y), ('brick_break', source, x, y, color),
+#   ('laser',), ('power_up', type), ('life_lost',), ('game_over',),
+#   ('level_complete', level_index), ('you_win',)
+# where source is what bounced or broke the brick ('ball', 'extra_ball' or
+# 'laser'). Collisions only record what they hit in the frame's event list;
+# the consequences are worked out from the list afterwards, each in one
+# pass: power-up drops once the balls have hit their bricks, then score
+# and particles at the end of the frame (particles only with effects on).
+# Every game is seeded: gameplay (launch directions, multi-ball angles,
+# drops) draws from self.rng and particles from their own stream, so the same
+# seed and inputs always play out the same, with or without effects.
+class GameSession:
+    def __init__(self, screen_width=800, screen_height=600, level_index=0, effects=True,
+                 collision_mode='discrete', seed=None):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.effects = effects  # Headless runs can skip the particle effects
+        # 'discrete' tests the ball where it ends up after each move, 'swept'
+        # finds the first brick along the move so fast balls can't tunnel
+        self.collision_mode = collision_mode
+
+        self.rng = random.Random()
+        self.paddle = Paddle(screen_width, screen_height)
+        self.ball = Ball(screen_width, screen_height, self.rng)
+        self.additional_balls = []  # For multi-ball power-up
+        self.bricks = BrickStore.from_bricks([])
+        self.brick_grid = BrickGrid(self.bricks)
+        self.power_ups = []
+        self.lasers = []
+        self.particles = ParticleSystem()
+        self.timers = TimerQueue()  # Power-up expiries, keyed on self.frame
+
+        self.reset(level_index, seed)
+
+    def reset(self, level_index=0, seed=None):
+        # A new game gets a fresh seed unless one is given (e.g. to replay it)
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng.seed(self.seed)
+        self.particles.seed(self.seed)
+        self.paddle.reset()
+
+        self.current_level = level_index
+        self.load_bricks(BrickStore.from_bricks(build_level(self.current_level)))
+
+        # Use the safe ball reset function instead of the standard reset
+        safe_reset_ball(self.ball, self.bricks, self.paddle)
+
+        self.state = 'playing'
+        self.frame = 0
+        self.score = 0
+        self.lives = 3
+        self.power_ups.clear()
+        self.lasers.clear()
+        self.particles.clear()
+        self.additional_balls.clear()
+        self.timers.clear()
+
+    def load_bricks(self, bricks, grid=None):
+        # grid may be passed in when it was built for the same layout
+        self.bricks = bricks
+        self.brick_grid = grid if grid is not None else BrickGrid(bricks)
+
+    def remove_brick(self, index):
+        self.bricks.kill(index)
+
+    def balls(self):
+        return [self.ball] + self.additional_balls
+
+    def _check_ball_brick_collision(self, current_ball, events):
+        if self.collision_mode == 'swept' and not current_ball.is_glued:
+            self._check_ball_brick_sweep(current_ball, events)
+            return
+
+        # Only the first brick hit in this frame counts
+        brick = self.brick_grid.first_hit(current_ball.rect)
+        if brick is None:
+            return
+
+        # Check if we should go through the brick (strong ball)
+        if not current_ball.is_strong:
+            current_ball.speed_y *= -1
+
+        self._break_brick(brick, 'ball', events)
+
+    def _check_ball_brick_sweep(self, current_ball, events):
+        start_x, start_y = current_ball.prev_position
+        dx = current_ball.rect.x - start_x
+        dy = current_ball.rect.y - start_y
+        start = current_ball.rect.move(-dx, -dy)
+        hits = self.brick_grid.sweep(start, dx, dy)
+        if not hits:
+            return
+
+        if current_ball.is_strong:
+            # A strong ball goes through everything along its path
+            for _, brick, _ in hits:
+                self._break_brick(brick, 'ball', events)
+            return
+
+        # Stop at the first contact and bounce off the side that was hit
+        time, brick, axis = hits[0]
+        current_ball.rect.x = start_x + int(dx * time)
+        current_ball.rect.y = start_y + int(dy * time)
+        if axis == 'x':
+            current_ball.speed_x = -abs(current_ball.speed_x) if dx > 0 else abs(current_ball.speed_x)
+        else:
+            current_ball.speed_y = -abs(current_ball.speed_y) if dy > 0 else abs(current_ball.speed_y)
+        self._break_brick(brick, 'ball', events)
+
+    def _break_brick(self, brick, source, events):
+        # The brick goes at once so nothing else hits it this frame, the
+        # rest happens when the frame's events are handled
+        self.remove_brick(brick)
+        events.append(('brick_break', source, *self.bricks.center(brick), self.bricks.color(brick)))
+
+    # --- Handling the frame's events ---
+    def _drop_power_ups(self, events):
+        # Bricks broken by a ball may drop a power-up
+        for event in events:
+            if event[0] == 'brick_break' and event[1] == 'ball' and self.rng.random() < 0.3:
+                self.power_ups.append(PowerUp(event[2], event[3], self.rng.choice(POWER_UP_TYPES)))
+
+    def _add_score(self, events):
+        breaks = sum(1 for event in events if event[0] == 'brick_break')
+        self.score += BRICK_SCORE * breaks
+
+    def _spawn_effects(self, events):
+        emit = self.particles.emit
+        for event in events:
+            kind = event[0]
+            if kind == 'bounce':
+                count, size = BOUNCE_PARTICLES[event[1]]
+                emit(count, event[2], event[3], BOUNCE_PARTICLE_COLOR, 1, size, 1, size, 0)
+            elif kind == 'brick_break':
+                count, size = BRICK_PARTICLES[event[1]]
+                emit(count, event[2], event[3], event[4], 1, size, 1, size, 0.05)
+
+    def _apply_power_up(self, power_up):
+        # Handle the power-up effects
+        if power_up.type == 'multi':
+            # Create 2 new balls
+            for _ in range(2):
+                new_ball = create_multi_ball(self.ball)
+                self.additional_balls.append(new_ball)
+                self.timers.schedule_all(new_ball)
+        elif power_up.type == 'extra_life':
+            self.lives += 1
+        elif power_up.type in ['grow', 'laser', 'glue', 'shrink']:
+            self.paddle.activate_power_up(power_up.type, self.frame)
+            self.timers.schedule(self.paddle, power_up.type)
+        elif power_up.type in ['slow', 'fast', 'strong']:
+            # Apply to all additional balls too
+            for current_ball in self.balls():
+                current_ball.activate_power_up(power_up.type, self.frame)
+                self.timers.schedule(current_ball, power_up.type)
+
+    def step(self, inputs=NO_INPUT):
+        events = []
+        if self.state != 'playing':
+            return events
+        self.frame += 1
+
+        # In playing state, launch glued ball
+        if inputs.space and self.ball.is_glued:
+            self.ball.is_glued = False
+
+        if inputs.fire and self.paddle.has_laser:
+            self.lasers.append(Laser(self.paddle.rect.centerx - 30, self.paddle.rect.top))
+            self.lasers.append(Laser(self.paddle.rect.centerx + 30, self.paddle.rect.top))
+            events.append(('laser',))
+
+        # --- Update all game objects ---
+        self.paddle.update(inputs.left, inputs.right)
+        self.timers.expire(self.frame)  # After the paddle moves, before the balls do
+        ball_status, collision_object = self.ball.update(self.paddle, inputs.space)
+
+        # Update all additional balls
+        balls_to_remove = []
+        for i, extra_ball in enumerate(self.additional_balls):
+            status, collision = extra_ball.update(self.paddle, inputs.space)
+            if status == 'lost':
+                balls_to_remove.append(i)
+            elif collision in ['wall', 'paddle']:
+                events.append(('bounce', 'extra_ball', extra_ball.rect.centerx, extra_ball.rect.centery))
+
+        # Remove lost balls
+        for i in reversed(balls_to_remove):
+            del self.additional_balls[i]
+
+        if ball_status == 'lost':
+            # Only lose a life if there are no additional balls
+            if not self.additional_balls:
+                self.lives -= 1
+                events.append(('life_lost',))
+                if self.lives <= 0:
+                    self.state = 'game_over'
+                    events.append(('game_over',))
+                else:
+                    # Use safe ball reset
+                    safe_reset_ball(self.ball, self.bricks, self.paddle)
+                    self.paddle.reset()
+            else:
+                # If we have additional balls, just remove the main ball
+                # and make one of the additional balls the new main ball
+                self.ball = self.additional_balls.pop(0)
+
+        elif collision_object in ['wall', 'paddle']:
+            events.append(('bounce', 'ball', self.ball.rect.centerx, self.ball.rect.centery))
+
+        # Ball collision with bricks - main ball, then additional balls
+        self._check_ball_brick_collision(self.ball, events)
+        for extra_ball in self.additional_balls:
+            self._check_ball_brick_collision(extra_ball, events)
+        self._drop_power_ups(events)  # Before the power-ups fall this frame
+
+        for power_up in self.power_ups[:]:
+            power_up.update()
+            if power_up.rect.top > self.screen_height:
+                self.power_ups.remove(power_up)
+            elif self.paddle.rect.colliderect(power_up.rect):
+                events.append(('power_up', power_up.type))
+                self._apply_power_up(power_up)
+                self.power_ups.remove(power_up)
+
+        for laser in self.lasers[:]:
+            laser.update()
+            if laser.rect.bottom < 0:
+                self.lasers.remove(laser)
+            else:
+                brick = self.brick_grid.first_hit(laser.rect)
+                if brick is not None:
+                    self._break_brick(brick, 'laser', events)
+                    self.lasers.remove(laser)
+
+        if self.bricks.live_count == 0:
+            # If current level is not the last one, advance to next level
+            if self.current_level < len(LEVELS) - 1:
+                self.current_level += 1
+                self.paddle.reset()
+                self.load_bricks(BrickStore.from_bricks(build_level(self.current_level)))
+                self.power_ups.clear()
+                self.lasers.clear()
+                self.additional_balls.clear()  # Clear additional balls between levels
+                # Use safe ball reset for next level
+                safe_reset_ball(self.ball, self.bricks, self.paddle)
+                events.append(('level_complete', self.current_level))
+            else:
+                self.state = 'you_win'
+                events.append(('you_win',))
+
+        self._add_score(events)
+        if self.effects:
+            self._spawn_effects(events)
+        return events
+
+    # --- Event-driven fast-forward ---
+    # Between contacts every ball, falling power-up and laser moves in a
+    # straight line by a whole number of pixels per frame, and power-ups only
+    # wear off at the ticks held in self.timers. fast_forward() works
+    # out the earliest frame at which anything else could happen (a wall,
+    # paddle or brick contact, a lost ball, a caught power-up, a timer
+    # expiring), jumps straight to the frame before it and then runs that
+    # frame with step(). The predictions are lower bounds, so the result is
+    # always identical to calling step() once per frame.
+    def fast_forward(self, max_frames, inputs=NO_INPUT):
+        if self.state != 'playing' or max_frames <= 0:
+            return 0, []
+        skip = 0
+        if self._can_skip(inputs):
+            skip = min(self._frames_until_event(), max_frames) - 1
+            if skip > 0:
+                self._advance_free(skip)
+        return skip + 1, self.step(inputs)
+
+    def _can_skip(self, inputs):
+        # Paddle input and firing change things every frame, and space
+        # launches glued balls at a random angle
+        if inputs.left or inputs.right or inputs.fire:
+            return False
+        return not (inputs.space and any(ball.is_glued for ball in self.balls()))
+
+    def _ball_steps(self, ball):
+        # Pixels the rect moves this frame, including pygame's rounding of
+        # the float speed, which is the same on every frame in the field
+        speed_multiplier = 1.0
+        if ball.is_slowed:
+            speed_multiplier *= 0.5
+        if ball.is_fast:
+            speed_multiplier *= 2.0
+        probe = ball.rect.copy()
+        probe.x += ball.speed_x * speed_multiplier
+        probe.y += ball.speed_y * speed_multiplier
+        return probe.x - ball.rect.x, probe.y - ball.rect.y
+
+    def _frames_until_event(self):
+        paddle = self.paddle
+        frames = []
+        next_expiry = self.timers.next_tick()
+        if next_expiry is not None:
+            frames.append(max(next_expiry - self.frame, 1))
+
+        for ball in self.balls():
+            if ball.is_glued:
+                continue
+
+            step_x, step_y = self._ball_steps(ball)
+            rect = ball.rect
+            frames.append(_frames_until_below(rect.top, step_y, 0))  # Top wall
+            frames.append(_frames_until_below(rect.left, step_x, 0))  # Left wall
+            frames.append(_frames_until_below(-rect.right, -step_x, -self.screen_width))  # Right wall
+            frames.append(_frames_until_below(-rect.top, -step_y, -self.screen_height - 1))  # Lost
+            if ball.speed_y > 0:
+                frames.append(_frames_to_contact(_contact_time(rect, step_x, step_y, paddle.rect)))
+            frames.append(_frames_to_contact(self.brick_grid.earliest_contact(rect, step_x, step_y)))
+
+        for power_up in self.power_ups:
+            rect = power_up.rect
+            frames.append(_frames_until_below(-rect.top, -power_up.speed_y, -self.screen_height - 1))
+            frames.append(_frames_to_contact(_contact_time(rect, 0, power_up.speed_y, paddle.rect)))
+
+        for laser in self.lasers:
+            rect = laser.rect
+            frames.append(_frames_until_below(rect.bottom, laser.speed_y, -1))
+            frames.append(_frames_to_contact(self.brick_grid.earliest_contact(rect, 0, laser.speed_y)))
+
+        return min(frames, default=float('inf'))
+
+    def _advance_free(self, frames):
+        # Apply `frames` frames in which nothing but movement happens
+        self.frame += frames
+        for ball in self.balls():
+            if not ball.is_glued:
+                step_x, step_y = self._ball_steps(ball)
+                ball.rect.move_ip(step_x * (frames - 1), step_y * (frames - 1))
+                ball.prev_position = ball.rect.topleft
+                ball.rect.move_ip(step_x, step_y)
+            else:
+                # Ball.update puts a glued ball on the paddle, which stays put here
+                ball.prev_position = ball.rect.topleft
+                ball.rect.centerx = self.paddle.rect.centerx
+                ball.rect.bottom = self.paddle.rect.top
+
+        for mover in self.power_ups + self.lasers:
+            mover.rect.y += mover.speed_y * (frames - 1)
+            mover.prev_position = mover.rect.topleft
+            mover.rect.y += mover.speed_y
+
+    def save_state(self):
+        # An immutable bytes snapshot of the whole game, see snapshot.py
+        return take_snapshot(self)
+
+    def restore_state(self, saved_state):
+        restore_snapshot(self, saved_state)
+
+    def state_hash(self, paddle=True):
+        # CRC32 of everything that decides how the game goes on: the balls,
+        # the paddle, which bricks are left, falling power-ups, lasers,
+        # power-up expiry ticks, score and lives. Two runs that agree on it
+        # every tick played the same game. The frame counter, random
+        # generators and effects are left out, so a game that comes back to
+        # the same position hashes the same (see soak.py). paddle=False
+        # leaves the paddle out too, since where it is only decides whether
+        # a ball bounces, never which way.
+        h = zlib.crc32(_HASH_HEAD.pack(self.current_level, STATES.index(self.state), self.score, self.lives))
+        h = zlib.crc32(self.bricks.alive, h)
+        if paddle:
+            p = self.paddle
+            h = zlib.crc32(_HASH_PADDLE.pack(*p.rect, p.width, p.has_laser, p.has_glue, p.has_shrink,
+                                             *p.power_up_ends.values()), h)
+        for ball in self.balls():
+            h = zlib.crc32(_HASH_BALL.pack(*ball.rect, ball.speed_x, ball.speed_y, ball.is_glued,
+                                           ball.is_slowed, ball.is_fast, ball.is_strong,
+                                           *ball.power_up_ends.values()), h)
+        for power_up in self.power_ups:
+            h = zlib.crc32(_HASH_POWER_UP.pack(POWER_UP_TYPES.index(power_up.type), *power_up.rect.topleft), h)
+        for laser in self.lasers:
+            h = zlib.crc32(_HASH_LASER.pack(*laser.rect.topleft), h)
+        return h
+
+    def update_effects(self):
+        # Particles keep animating in every screen, not only while playing
+        self.particles.update()
+
+
+def _frames_until_below(start, step, limit):
+    # First frame on which start + frame * step <= limit
+    if start + step <= limit:
+        return 1
+    if step >= 0:
+        return float('inf')
+    return -(-(start - limit) // -step)
+
+
+def _contact_time(rect, dx, dy, target):
+    # When a box moving by (dx, dy) a frame starts to overlap target, or None
+    entry, exit, _ = box_entry(rect, dx, dy, target.x, target.y, target.width, target.height)
+    if entry < exit and exit > 0:
+        return entry
+    return None
+
+
+def _frames_to_contact(contact):
+    # First frame that can overlap, from a contact time measured in frames
+    if contact is None:
+        return float('inf')
+    return max(math.floor(contact) + 1, 1)
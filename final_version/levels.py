@@ -0,0 +1,126 @@
+import math
+from game_objects import Brick
+
+# -- Colors --
+BRICK_COLORS = [(178, 34, 34), (255, 165, 0), (255, 215, 0), (50, 205, 50)]
+
+# --- Level Design Functions ---
+def create_basic_wall(rows=4, cols=10):
+    bricks = []
+    brick_width = 75
+    brick_height = 20
+    brick_padding = 5
+    wall_start_y = 50
+    for row in range(rows):
+        for col in range(cols):
+            x = col * (brick_width + brick_padding) + brick_padding
+            y = row * (brick_height + brick_padding) + wall_start_y
+            color = BRICK_COLORS[row % len(BRICK_COLORS)]
+            bricks.append(Brick(x, y, brick_width, brick_height, color))
+    return bricks
+
+def create_pyramid_wall():
+    bricks = []
+    brick_width = 75
+    brick_height = 20
+    brick_padding = 5
+    wall_start_y = 50
+    max_cols = 15
+    
+    for row in range(8):  # 8 rows for the pyramid
+        cols = max_cols - row
+        start_x = (row * (brick_width + brick_padding)) // 2
+        
+        for col in range(cols):
+            x = start_x + col * (brick_width + brick_padding)
+            y = row * (brick_height + brick_padding) + wall_start_y
+            color = BRICK_COLORS[row % len(BRICK_COLORS)]
+            bricks.append(Brick(x, y, brick_width, brick_height, color))
+    
+    return bricks
+
+def create_diamond_wall(screen_width=800):
+    bricks = []
+    brick_width = 75
+    brick_height = 20
+    brick_padding = 5
+    wall_start_y = 50
+    max_width = 12  # Maximum number of bricks in the middle row
+    
+    # Top half (increasing width)
+    for row in range(max_width // 2):
+        num_bricks = 2 * row + 1
+        start_x = (screen_width - num_bricks * (brick_width + brick_padding)) // 2
+        
+        for col in range(num_bricks):
+            x = start_x + col * (brick_width + brick_padding)
+            y = row * (brick_height + brick_padding) + wall_start_y
+            color = BRICK_COLORS[row % len(BRICK_COLORS)]
+            bricks.append(Brick(x, y, brick_width, brick_height, color))
+    
+    # Bottom half (decreasing width)
+    for row in range(max_width // 2, max_width):
+        row_from_middle = row - max_width // 2
+        num_bricks = max_width - 2 * row_from_middle
+        start_x = (screen_width - num_bricks * (brick_width + brick_padding)) // 2
+        
+        for col in range(num_bricks):
+            x = start_x + col * (brick_width + brick_padding)
+            y = row * (brick_height + brick_padding) + wall_start_y
+            color = BRICK_COLORS[row % len(BRICK_COLORS)]
+            bricks.append(Brick(x, y, brick_width, brick_height, color))
+    
+    return bricks
+
+def create_wave_wall():
+    bricks = []
+    brick_width = 75
+    brick_height = 20
+    brick_padding = 5
+    wall_start_y = 50
+    rows = 6
+    cols = 10
+    
+    for row in range(rows):
+        wave_offset = int(math.sin(row * 0.8) * 40)  # Create a wave pattern
+        
+        for col in range(cols):
+            x = col * (brick_width + brick_padding) + brick_padding + wave_offset
+            y = row * (brick_height + brick_padding) + wall_start_y
+            color = BRICK_COLORS[row % len(BRICK_COLORS)]
+            bricks.append(Brick(x, y, brick_width, brick_height, color))
+    
+    return bricks
+
+def create_checkerboard_wall():
+    bricks = []
+    brick_width = 75
+    brick_height = 20
+    brick_padding = 5
+    wall_start_y = 50
+    rows = 5
+    cols = 10
+    
+    for row in range(rows):
+        for col in range(cols):
+            # Skip every other brick to create checkerboard
+            if (row + col) % 2 == 0:
+                x = col * (brick_width + brick_padding) + brick_padding
+                y = row * (brick_height + brick_padding) + wall_start_y
+                color = BRICK_COLORS[row % len(BRICK_COLORS)]
+                bricks.append(Brick(x, y, brick_width, brick_height, color))
+    
+    return bricks
+
+# Level configurations
+LEVELS = [
+    {"name": "Level 1", "create_function": create_basic_wall, "args": {"rows": 4, "cols": 10}},
+    {"name": "Level 2", "create_function": create_pyramid_wall, "args": {}},
+    {"name": "Level 3", "create_function": create_diamond_wall, "args": {}},
+    {"name": "Level 4", "create_function": create_wave_wall, "args": {}},
+    {"name": "Level 5", "create_function": create_checkerboard_wall, "args": {}}
+]
+
+def build_level(level_index):
+    level = LEVELS[level_index]
+    return level["create_function"](**level["args"])
@@ -2,7 +2,15 @@ import pygame
 import sys
 import random
 import math
-from game_objects import Paddle, Ball, Brick, PowerUp, Laser, Particle, Firework
+from game_objects import PowerUp, ParticleSystem, Firework
+from game_session import GameSession, FrameInput
+from levels import LEVELS
+from rendering import BrickLayer, DirtyRects, TextCache
+from scheduler import FixedStep
+from replay import InputRecorder
+from rewind import RewindBuffer
+from save_slots import SaveSlots
+from save_file import SaveFile
 
 # -- General Setup --
 pygame.init()
@@ -15,11 +23,49 @@ screen_height = 600
 screen = pygame.display.set_mode((screen_width, screen_height))
 pygame.display.set_caption("PyGame Arkanoid")
 
+# Push only the changed parts of the playing screen to the display instead
+# of flipping the whole buffer every frame (helps slow machines most)
+DIRTY_RECT_UPDATES = True
+
+# The game is simulated at a fixed SIM_RATE ticks per second whatever rate
+# frames are drawn at (up to MAX_RENDER_FPS). A frame that falls behind runs
+# at most MAX_SIM_STEPS_PER_FRAME ticks before drawing again.
+SIM_RATE = 60
+MAX_RENDER_FPS = 144
+MAX_SIM_STEPS_PER_FRAME = 5
+
+# Every game's seed and inputs are written here when it ends, see replay.py
+REPLAY_PATH = 'last_game.replay'
+
+# Holding this key rolls the game back one tick per tick, up to the last
+# 10 seconds of play (see rewind.py)
+REWIND_KEY = pygame.K_r
+
+# On the pause screen keys 1 to SAVE_SLOT_COUNT save the game into that
+# slot; with Shift held they load it (also from the main menu and game over
+# screens). Pausing also saves into PAUSE_SLOT.
+SAVE_SLOT_COUNT = 5
+SAVE_SLOT_KEYS = [pygame.K_1 + i for i in range(SAVE_SLOT_COUNT)]
+PAUSE_SLOT = 'pause'
+
+# Save slots are kept here between runs, see save_file.py
+SAVE_PATH = 'arkanoid.sav'
+
+# Screens where nothing moves block on input instead of redrawing at 60 FPS.
+# The game over screen only needs this many ms between frames for its
+# flashing title once the explosion is over.
+GAME_OVER_FLASH_INTERVAL = 33
+
+# On-screen timings, in ms of wall-clock time so they don't depend on the
+# frame rate
+POWER_UP_MESSAGE_DURATION = 2000
+LEVEL_MESSAGE_DURATION = 3000
+GAME_OVER_EFFECT_DURATION = 3000
+
 # -- Colors --
 BG_COLOR = pygame.Color('grey12')
 PAUSE_OVERLAY_COLOR = (0, 0, 0, 180)  # Semi-transparent black
 GAME_OVER_BG_COLOR = pygame.Color(40, 0, 0)  # Dark red background for game over
-BRICK_COLORS = [(178, 34, 34), (255, 165, 0), (255, 215, 0), (50, 205, 50)]
 BUTTON_COLOR = (100, 100, 100)
 BUTTON_HOVER_COLOR = (150, 150, 150)
 BUTTON_TEXT_COLOR = (255, 255, 255)
@@ -36,6 +82,9 @@ message_font = pygame.font.Font(None, 30)
 button_font = pygame.font.Font(None, 36)
 big_font = pygame.font.Font(None, 90)  # Larger font for game over
 
+# Rendered labels and counters are reused instead of re-rasterized every frame
+text_cache = TextCache()
+
 # -- Sound Setup --
 try:
     bounce_sound = pygame.mixer.Sound('bounce.wav')
@@ -49,19 +98,21 @@ except pygame.error as e:
         def play(self): pass
     bounce_sound = brick_break_sound = game_over_sound = laser_sound = powerup_sound = DummySound()
 
+# Sound for each kind of gameplay event. However many of a kind happen in
+# one frame (several bricks, bounces of every ball, catch-up ticks), the
+# sound is started once.
+EVENT_SOUNDS = {
+    'bounce': bounce_sound,
+    'brick_break': brick_break_sound,
+    'laser': laser_sound,
+    'power_up': powerup_sound,
+    'game_over': game_over_sound,
+}
+
 # -- Mute Button Setup --
-is_muted = False
 mute_button_rect = pygame.Rect(screen_width - 50, 10, 40, 40)
 
-def toggle_mute():
-    global is_muted
-    is_muted = not is_muted
-    volume = 0.0 if is_muted else 1.0
-    for sound in [bounce_sound, brick_break_sound, game_over_sound, laser_sound, powerup_sound]:
-        if hasattr(sound, 'set_volume'):  # Check if it's a real sound object
-            sound.set_volume(volume)
-
-def draw_mute_button(screen):
+def draw_mute_button(screen, is_muted):
     # Draw button background
     button_color = (100, 100, 100)
     pygame.draw.rect(screen, button_color, mute_button_rect)
@@ -93,199 +144,7 @@ def draw_mute_button(screen):
                          (speaker_x + 22, speaker_y + 12), 
                          3)
 
-# --- Ball Reset Function ---
-def safe_reset_ball(ball, bricks, paddle):
-    # Reset the ball to appear just above the paddle
-    ball.rect.centerx = paddle.rect.centerx
-    ball.rect.bottom = paddle.rect.top - 5
-    ball.speed_x = ball.base_speed * random.choice((1, -1))
-    ball.speed_y = -ball.base_speed
-    ball.is_glued = True  # Start with the ball glued to the paddle
-    ball.is_slowed = False
-    ball.is_fast = False
-    ball.is_strong = False
-    ball.slow_timer = 0
-    ball.fast_timer = 0
-    ball.strong_timer = 0
-
-# -- New function for creating a multi-ball --
-def create_multi_ball(main_ball):
-    new_ball = Ball(screen_width, screen_height)
-    new_ball.rect.centerx = main_ball.rect.centerx
-    new_ball.rect.centery = main_ball.rect.centery
-    # Give the new ball a random direction
-    angle = random.uniform(0.3, 0.7) * math.pi  # Random angle between 0.3π and 0.7π
-    new_ball.speed_x = main_ball.base_speed * math.cos(angle) * random.choice([-1, 1])
-    new_ball.speed_y = -main_ball.base_speed * math.sin(angle)
-    # Copy main ball's properties
-    new_ball.is_slowed = main_ball.is_slowed
-    new_ball.is_fast = main_ball.is_fast
-    new_ball.is_strong = main_ball.is_strong
-    new_ball.slow_timer = main_ball.slow_timer
-    new_ball.fast_timer = main_ball.fast_timer
-    new_ball.strong_timer = main_ball.strong_timer
-    
-    return new_ball
-
-# Function to check ball-brick collisions
-def check_ball_brick_collision(current_ball, bricks, power_ups, score, particles, is_muted):
-    bricks_to_remove = []
-    new_power_up = None
-    points_earned = 0
-    
-    for i, brick in enumerate(bricks):
-        if current_ball.rect.colliderect(brick.rect):
-            # Check if we should go through the brick (strong ball)
-            if not current_ball.is_strong:
-                current_ball.speed_y *= -1
-            
-            for _ in range(15):
-                particles.append(Particle(brick.rect.centerx, brick.rect.centery, 
-                                          brick.color, 1, 4, 1, 4, 0.05))
-            bricks_to_remove.append(i)
-            points_earned += 10
-            if not is_muted:
-                brick_break_sound.play()
-            
-            # Only create a power-up from the first brick hit in this frame
-            if random.random() < 0.3:
-                # Add new power-ups to the selection
-                power_up_type = random.choice([
-                    'grow', 'laser', 'glue', 'slow',  # Original power-ups
-                    'multi', 'extra_life', 'strong',  # New positive power-ups
-                    'fast', 'shrink'  # New negative power-ups
-                ])
-                new_power_up = PowerUp(brick.rect.centerx, brick.rect.centery, power_up_type)
-            break
-    
-    # Remove hit bricks (in reverse order to avoid index issues)
-    for i in reversed(bricks_to_remove):
-        if i < len(bricks):
-            del bricks[i]
-    
-    return points_earned, new_power_up
-
-# -- Game Objects --
-paddle = Paddle(screen_width, screen_height)
-ball = Ball(screen_width, screen_height)
-additional_balls = []  # For multi-ball power-up
-
-# --- Level Design Functions ---
-def create_basic_wall(rows=4, cols=10):
-    bricks = []
-    brick_width = 75
-    brick_height = 20
-    brick_padding = 5
-    wall_start_y = 50
-    for row in range(rows):
-        for col in range(cols):
-            x = col * (brick_width + brick_padding) + brick_padding
-            y = row * (brick_height + brick_padding) + wall_start_y
-            color = BRICK_COLORS[row % len(BRICK_COLORS)]
-            bricks.append(Brick(x, y, brick_width, brick_height, color))
-    return bricks
-
-def create_pyramid_wall():
-    bricks = []
-    brick_width = 75
-    brick_height = 20
-    brick_padding = 5
-    wall_start_y = 50
-    max_cols = 15
-    
-    for row in range(8):  # 8 rows for the pyramid
-        cols = max_cols - row
-        start_x = (row * (brick_width + brick_padding)) // 2
-        
-        for col in range(cols):
-            x = start_x + col * (brick_width + brick_padding)
-            y = row * (brick_height + brick_padding) + wall_start_y
-            color = BRICK_COLORS[row % len(BRICK_COLORS)]
-            bricks.append(Brick(x, y, brick_width, brick_height, color))
-    
-    return bricks
-
-def create_diamond_wall():
-    bricks = []
-    brick_width = 75
-    brick_height = 20
-    brick_padding = 5
-    wall_start_y = 50
-    max_width = 12  # Maximum number of bricks in the middle row
-    
-    # Top half (increasing width)
-    for row in range(max_width // 2):
-        num_bricks = 2 * row + 1
-        start_x = (screen_width - num_bricks * (brick_width + brick_padding)) // 2
-        
-        for col in range(num_bricks):
-            x = start_x + col * (brick_width + brick_padding)
-            y = row * (brick_height + brick_padding) + wall_start_y
-            color = BRICK_COLORS[row % len(BRICK_COLORS)]
-            bricks.append(Brick(x, y, brick_width, brick_height, color))
-    
-    # Bottom half (decreasing width)
-    for row in range(max_width // 2, max_width):
-        row_from_middle = row - max_width // 2
-        num_bricks = max_width - 2 * row_from_middle
-        start_x = (screen_width - num_bricks * (brick_width + brick_padding)) // 2
-        
-        for col in range(num_bricks):
-            x = start_x + col * (brick_width + brick_padding)
-            y = row * (brick_height + brick_padding) + wall_start_y
-            color = BRICK_COLORS[row % len(BRICK_COLORS)]
-            bricks.append(Brick(x, y, brick_width, brick_height, color))
-    
-    return bricks
-
-def create_wave_wall():
-    bricks = []
-    brick_width = 75
-    brick_height = 20
-    brick_padding = 5
-    wall_start_y = 50
-    rows = 6
-    cols = 10
-    
-    for row in range(rows):
-        wave_offset = int(math.sin(row * 0.8) * 40)  # Create a wave pattern
-        
-        for col in range(cols):
-            x = col * (brick_width + brick_padding) + brick_padding + wave_offset
-            y = row * (brick_height + brick_padding) + wall_start_y
-            color = BRICK_COLORS[row % len(BRICK_COLORS)]
-            bricks.append(Brick(x, y, brick_width, brick_height, color))
-    
-    return bricks
-
-def create_checkerboard_wall():
-    bricks = []
-    brick_width = 75
-    brick_height = 20
-    brick_padding = 5
-    wall_start_y = 50
-    rows = 5
-    cols = 10
-    
-    for row in range(rows):
-        for col in range(cols):
-            # Skip every other brick to create checkerboard
-            if (row + col) % 2 == 0:
-                x = col * (brick_width + brick_padding) + brick_padding
-                y = row * (brick_height + brick_padding) + wall_start_y
-                color = BRICK_COLORS[row % len(BRICK_COLORS)]
-                bricks.append(Brick(x, y, brick_width, brick_height, color))
-    
-    return bricks
-
-# Level configurations
-LEVELS = [
-    {"name": "Level 1", "create_function": create_basic_wall, "args": {"rows": 4, "cols": 10}},
-    {"name": "Level 2", "create_function": create_pyramid_wall, "args": {}},
-    {"name": "Level 3", "create_function": create_diamond_wall, "args": {}},
-    {"name": "Level 4", "create_function": create_wave_wall, "args": {}},
-    {"name": "Level 5", "create_function": create_checkerboard_wall, "args": {}}
-]
+    return mute_button_rect
 
 # -- Menu and Button Setup --
 def create_level_buttons():
@@ -354,452 +213,375 @@ def draw_button(screen, rect, text, hover=False, is_resume=False, is_reset=False
     pygame.draw.rect(screen, color, rect)
     pygame.draw.rect(screen, BUTTON_BORDER_COLOR, rect, 2)
     
-    text_surf = button_font.render(text, True, BUTTON_TEXT_COLOR)
+    text_surf = text_cache.render(button_font, text, BUTTON_TEXT_COLOR)
     text_rect = text_surf.get_rect(center=rect.center)
     screen.blit(text_surf, text_rect)
+    return rect
 
 def is_button_hovered(rect, mouse_pos):
     return rect.collidepoint(mouse_pos)
 
-# Initialize game objects
-current_level = 0
-bricks = []
-power_ups = []
-lasers = []
-particles = []
-fireworks = []
-game_over_particles = []
-game_over_time = 0
-
-# --- Game Variables ---
-game_state = 'main_menu'  # Start with main menu instead of title screen
-previous_state = None  # Track where we came from for back button functionality
-score = 0
-lives = 3
-display_message = ""
-message_timer = 0
-firework_timer = 0
-has_paused_game = False  # Track if there's a paused game to resume
-
-# Game progress storage
-saved_game_state = {
-    'level': 0,
-    'bricks': [],
-    'score': 0,
-    'lives': 3,
-    'paddle_state': None,
-    'ball_state': None,
-    'power_ups': [],
-    'lasers': [],
-    'additional_balls': []
-}
-
-def save_game_state():
-    global saved_game_state, has_paused_game
-    
-    # Save current game state
-    saved_game_state = {
-        'level': current_level,
-        'bricks': bricks.copy(),
-        'score': score,
-        'lives': lives,
-        'paddle_state': {
-            'rect': paddle.rect.copy(),
-            'width': paddle.width,
-            'has_laser': paddle.has_laser,
-            'has_glue': paddle.has_glue,
-            'has_shrink': paddle.has_shrink,
-            'power_up_timers': paddle.power_up_timers.copy()
-        },
-        'ball_state': {
-            'rect': ball.rect.copy(),
-            'speed_x': ball.speed_x,
-            'speed_y': ball.speed_y,
-            'is_glued': ball.is_glued,
-            'is_slowed': ball.is_slowed,
-            'is_fast': ball.is_fast,
-            'is_strong': ball.is_strong,
-            'slow_timer': ball.slow_timer,
-            'fast_timer': ball.fast_timer,
-            'strong_timer': ball.strong_timer
-        },
-        'power_ups': power_ups.copy(),
-        'lasers': lasers.copy(),
-        'additional_balls': additional_balls.copy()
-    }
-    has_paused_game = True
-
-def restore_game_state():
-    global current_level, bricks, score, lives, power_ups, lasers, additional_balls
-    
-    # Restore game state from saved state
-    current_level = saved_game_state['level']
-    bricks = saved_game_state['bricks']
-    score = saved_game_state['score']
-    lives = saved_game_state['lives']
-    
-    # Restore paddle state
-    paddle_state = saved_game_state['paddle_state']
-    paddle.rect = paddle_state['rect']
-    paddle.width = paddle_state['width']
-    paddle.has_laser = paddle_state['has_laser']
-    paddle.has_glue = paddle_state['has_glue']
-    paddle.has_shrink = paddle_state['has_shrink']
-    paddle.power_up_timers = paddle_state['power_up_timers']
-    
-    # Restore ball state
-    ball_state = saved_game_state['ball_state']
-    ball.rect = ball_state['rect']
-    ball.speed_x = ball_state['speed_x']
-    ball.speed_y = ball_state['speed_y']
-    ball.is_glued = ball_state['is_glued']
-    ball.is_slowed = ball_state['is_slowed']
-    ball.is_fast = ball_state['is_fast']
-    ball.is_strong = ball_state['is_strong']
-    ball.slow_timer = ball_state['slow_timer']
-    ball.fast_timer = ball_state['fast_timer']
-    ball.strong_timer = ball_state['strong_timer']
-    
-    # Restore other objects
-    power_ups = saved_game_state['power_ups']
-    lasers = saved_game_state['lasers']
-    additional_balls = saved_game_state['additional_balls']
+# Draw semi-transparent overlay for pause screen (built once, on first use)
+pause_overlay = None
 
-def reset_game(level_index=0):
-    global bricks, score, lives, power_ups, lasers, particles, fireworks, current_level, additional_balls
-    
-    paddle.reset()
-    
-    current_level = level_index
-    level = LEVELS[current_level]
-    bricks = level["create_function"](**level["args"])
-    
-    # Use the safe ball reset function instead of the standard reset
-    safe_reset_ball(ball, bricks, paddle)
-    
-    score = 0
-    lives = 3
-    power_ups.clear()
-    lasers.clear()
-    particles.clear()
-    fireworks.clear()
-    additional_balls.clear()
-
-# Draw semi-transparent overlay for pause screen
 def draw_pause_overlay(screen):
-    overlay = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))  # Semi-transparent black
-    screen.blit(overlay, (0, 0))
-
-# Create game over explosion effect
-def create_game_over_explosion():
-    global game_over_particles, game_over_time
-    game_over_particles = []
-    # Create explosion particles
-    for _ in range(150):
-        x = random.randint(0, screen_width)
-        y = random.randint(0, screen_height)
-        color = (random.randint(180, 255), random.randint(0, 80), random.randint(0, 50))
-        particle = Particle(x, y, color, 2, 6, 2, 6, 0.1)
-        game_over_particles.append(particle)
-    game_over_time = 180  # How long the effect lasts
-
-# -- Main Game Loop --
-while True:
-    # Get mouse position for button hover effects
-    mouse_pos = pygame.mouse.get_pos()
-    
+    global pause_overlay
+    if pause_overlay is None:
+        pause_overlay = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
+        pause_overlay.fill(PAUSE_OVERLAY_COLOR)
+    screen.blit(pause_overlay, (0, 0))
+
+# -- Application --
+# Everything that used to be a module global lives on the app (menus, saved
+# game, effects) or on its GameSession (gameplay), so nothing is shared
+# between instances.
+class ArkanoidApp:
+    def __init__(self, screen):
+        self.screen = screen
+        self.session = GameSession(screen_width, screen_height)
+        self.brick_layer = BrickLayer((screen_width, screen_height), BG_COLOR)
+        self.dirty_rects = DirtyRects()
+        self.sim_clock = FixedStep(SIM_RATE, MAX_SIM_STEPS_PER_FRAME)
+        self.fire_pressed = False  # Held until the next simulation tick uses it
+        self.recorder = None  # Inputs of the game being played
+        self.rewind_buffer = RewindBuffer()
+        self.last_drawn_state = None
+        self.pause_backdrop = None  # Frozen game frame behind the pause menu
+        self.pause_view = None  # What the pause menu last drew (hover and mute state)
+
+        # Initialize effect objects
+        self.fireworks = []
+        self.game_over_particles = ParticleSystem(150)
+        self.game_over_until = 0  # pygame.time.get_ticks() at which the explosion stops
+
+        # --- Game Variables ---
+        self.game_state = 'main_menu'  # Start with main menu instead of title screen
+        self.previous_state = None  # Track where we came from for back button functionality
+        self.display_message = ""
+        self.message_until = 0  # pygame.time.get_ticks() at which the message disappears
+        self.paused_at = 0
+        self.firework_timer = 0
+        self.is_muted = False
+        self.has_paused_game = False  # Track if there's a paused game to resume
+        self.save_file = SaveFile(SAVE_PATH)
+        self.save_slots = self.open_save_slots()  # Saved games by name
+
+    def toggle_mute(self):
+        self.is_muted = not self.is_muted
+        volume = 0.0 if self.is_muted else 1.0
+        for sound in [bounce_sound, brick_break_sound, game_over_sound, laser_sound, powerup_sound]:
+            if hasattr(sound, 'set_volume'):  # Check if it's a real sound object
+                sound.set_volume(volume)
+
+    def play_sound(self, sound):
+        if not self.is_muted:
+            sound.play()
+
+    def open_save_slots(self):
+        # Only the file's index is read here, slots are read when loaded
+        try:
+            self.save_file.read_index()
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read the save file. {e}")
+        return SaveSlots(self.save_file)
+
+    def save_game_state(self, name=PAUSE_SLOT):
+        self.save_slots.save(name, self.session)
+        self.save_file.write(self.save_slots)  # Written in the background
+        self.has_paused_game = True
+
+    def restore_game_state(self, name=PAUSE_SLOT):
+        # Load a saved game onto the pause screen, from where it is resumed
+        try:
+            if not self.save_slots.load(name, self.session):
+                return
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load the saved game. {e}")
+            return
+        # A loaded game can't be replayed from its seed and inputs alone,
+        # so the recording stops here
+        self.finish_recording()
+        self.rewind_buffer.clear()
+        self.fireworks.clear()
+        self.has_paused_game = True
+        self.message_until = 0
+        self.paused_at = pygame.time.get_ticks()
+        self.pause_backdrop = None
+        if self.game_state != 'paused':
+            self.previous_state = self.game_state
+            self.game_state = 'paused'
+
+    def reset_game(self, level_index=0):
+        self.finish_recording()
+        self.session.reset(level_index)
+        self.recorder = InputRecorder(self.session)
+        self.rewind_buffer.clear()
+        self.fireworks.clear()
+
+    def finish_recording(self):
+        if self.recorder is not None and len(self.recorder.replay):
+            try:
+                self.recorder.replay.save(REPLAY_PATH)
+            except OSError as e:
+                print(f"Warning: Could not save the replay. {e}")
+        self.recorder = None
+
+    # Create game over explosion effect
+    def create_game_over_explosion(self):
+        self.game_over_particles.clear()
+        # Create explosion particles
+        for _ in range(150):
+            x = random.randint(0, screen_width)
+            y = random.randint(0, screen_height)
+            color = (random.randint(180, 255), random.randint(0, 80), random.randint(0, 50))
+            self.game_over_particles.emit(1, x, y, color, 2, 6, 2, 6, 0.1)
+        self.game_over_until = pygame.time.get_ticks() + GAME_OVER_EFFECT_DURATION
+
+    def pause(self):
+        self.save_game_state()  # Save current game state before pausing
+        self.paused_at = pygame.time.get_ticks()
+        if self.recorder is not None:
+            self.recorder.mark_pause()
+        self.pause_backdrop = None  # Capture a fresh frame for the pause menu
+        self.previous_state = self.game_state
+        self.game_state = 'paused'
+
+    def quit(self):
+        self.save_file.flush()  # Let a save that is still being written finish
+        pygame.quit()
+        sys.exit()
+
     # --- Event Handling ---
-    for event in pygame.event.get():
+    def handle_event(self, event):
         if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-            
+            self.quit()
+
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_SPACE:
-                # In playing state, launch glued ball
-                if game_state == 'playing' and ball.is_glued:
-                    ball.is_glued = False
                 # In game over or win state, return to main menu
-                elif game_state in ['game_over', 'you_win']:
-                    game_state = 'main_menu'
-                    has_paused_game = False  # Reset paused game flag when game is over
-            
+                # (launching a glued ball is handled by the session)
+                if self.game_state in ['game_over', 'you_win']:
+                    self.game_state = 'main_menu'
+                    self.has_paused_game = False  # Reset paused game flag when game is over
+
             # ESC key to toggle pause
             if event.key == pygame.K_ESCAPE:
-                if game_state == 'playing':
-                    save_game_state()
-                    previous_state = game_state
-                    game_state = 'paused'
-                elif game_state == 'paused':
-                    game_state = 'playing'
-                
-            if event.key == pygame.K_f and paddle.has_laser and game_state == 'playing':
-                lasers.append(Laser(paddle.rect.centerx - 30, paddle.rect.top))
-                lasers.append(Laser(paddle.rect.centerx + 30, paddle.rect.top))
-                if not is_muted:
-                    laser_sound.play()
-                
+                if self.game_state == 'playing':
+                    self.pause()
+                elif self.game_state == 'paused':
+                    self.game_state = 'playing'
+
+            if event.key == pygame.K_f and self.game_state == 'playing':
+                self.fire_pressed = True
+
+            if event.key in SAVE_SLOT_KEYS:
+                name = str(SAVE_SLOT_KEYS.index(event.key) + 1)
+                if event.mod & pygame.KMOD_SHIFT:
+                    if self.game_state in ['paused', 'main_menu', 'game_over']:
+                        self.restore_game_state(name)
+                elif self.game_state == 'paused':
+                    self.save_game_state(name)
+
         # Handle mouse clicks
         if event.type == pygame.MOUSEBUTTONDOWN:
             # Check mute button in all states
             if mute_button_rect.collidepoint(event.pos):
-                toggle_mute()
-                
+                self.toggle_mute()
+
             # Main menu interactions
-            if game_state == 'main_menu':
+            if self.game_state == 'main_menu':
                 if play_button_rect.collidepoint(event.pos):
-                    previous_state = game_state
-                    game_state = 'level_select'
-                
+                    self.previous_state = self.game_state
+                    self.game_state = 'level_select'
+
                 if exit_button_rect.collidepoint(event.pos):
-                    pygame.quit()
-                    sys.exit()
-            
+                    self.quit()
+
             # Level select screen interactions
-            elif game_state == 'level_select':
+            elif self.game_state == 'level_select':
                 # Check back button - return to previous state
                 if back_button_rect.collidepoint(event.pos):
-                    if previous_state == 'paused':
-                        game_state = 'paused'  # Return to pause menu
+                    if self.previous_state == 'paused':
+                        self.game_state = 'paused'  # Return to pause menu
                     else:
-                        game_state = 'main_menu'  # Return to main menu
-                
+                        self.game_state = 'main_menu'  # Return to main menu
+
                 # Check level buttons
                 for button in level_buttons:
                     if button["rect"].collidepoint(event.pos):
-                        reset_game(button["level"])
-                        game_state = 'playing'
-                        has_paused_game = False  # Starting a new game clears the saved game
-            
+                        self.reset_game(button["level"])
+                        self.game_state = 'playing'
+                        self.has_paused_game = False  # Starting a new game clears the saved game
+
             # In-game interactions
-            elif game_state == 'playing':
+            elif self.game_state == 'playing':
                 # Pause button
                 if pause_button_rect.collidepoint(event.pos):
-                    save_game_state()  # Save current game state before pausing
-                    previous_state = game_state
-                    game_state = 'paused'
-            
+                    self.pause()
+
             # Pause menu interactions
-            elif game_state == 'paused':
+            elif self.game_state == 'paused':
                 # Resume button
                 if pause_resume_button_rect.collidepoint(event.pos):
-                    game_state = 'playing'
-                
+                    self.game_state = 'playing'
+
                 # Level select button
                 if pause_level_select_button_rect.collidepoint(event.pos):
-                    previous_state = game_state  # Remember we came from pause screen
-                    game_state = 'level_select'
-                
+                    self.previous_state = self.game_state  # Remember we came from pause screen
+                    self.game_state = 'level_select'
+
                 # Exit button (back to main menu and reset progress)
                 if pause_exit_button_rect.collidepoint(event.pos):
-                    game_state = 'main_menu'
-                    has_paused_game = False  # Clear saved game when exiting
-            
+                    self.game_state = 'main_menu'
+                    self.has_paused_game = False  # Clear saved game when exiting
+
             # Game over screen interactions
-            elif game_state == 'game_over':
+            elif self.game_state == 'game_over':
                 # Retry button
                 if game_over_retry_button_rect.collidepoint(event.pos):
-                    reset_game(current_level)  # Restart the current level
-                    game_state = 'playing'
-                    
+                    self.reset_game(self.session.current_level)  # Restart the current level
+                    self.game_state = 'playing'
+
                 # Menu button
                 if game_over_menu_button_rect.collidepoint(event.pos):
-                    game_state = 'main_menu'
-                    has_paused_game = False
+                    self.game_state = 'main_menu'
+                    self.has_paused_game = False
+
+    # --- Update the session and react to its events ---
+    def update_playing(self, frame_events):
+        # Sounds are left to play_event_sounds, once the frame's ticks are
+        # done, so the tick's events are added to frame_events
+        keys = pygame.key.get_pressed()
+        inputs = FrameInput(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_SPACE], self.fire_pressed)
+        self.fire_pressed = False
+        self.rewind_buffer.push(self.session)
+        if self.recorder is not None:
+            self.recorder.record(inputs)
+        events = self.session.step(inputs)
+        frame_events += events
+        for event in events:
+            kind = event[0]
+            if kind == 'power_up':
+                self.show_message(PowerUp.PROPERTIES[event[1]]['message'], POWER_UP_MESSAGE_DURATION)
+            elif kind == 'game_over':
+                self.game_state = 'game_over'
+                self.create_game_over_explosion()  # Create explosion effect
+                self.has_paused_game = False  # Clear paused game when game over
+                self.finish_recording()
+            elif kind == 'level_complete':
+                self.show_message(f"{LEVELS[event[1]]['name']}", LEVEL_MESSAGE_DURATION)
+            elif kind == 'you_win':
+                self.game_state = 'you_win'
+                self.has_paused_game = False  # Clear paused game when win
+                self.finish_recording()
+
+    def play_event_sounds(self, events):
+        for kind in {event[0] for event in events}:
+            if kind in EVENT_SOUNDS:
+                self.play_sound(EVENT_SOUNDS[kind])
+
+    def rewind_playing(self):
+        # One tick back. Once the buffer runs out the game stays frozen at
+        # the oldest tick it had until the key is let go.
+        self.fire_pressed = False
+        if self.rewind_buffer.pop(self.session) and self.recorder is not None:
+            self.recorder.rewind(self.session.frame)
+
+    def draw_game_objects(self, dirty=None, alpha=1.0):
+        # Returns the rects that were drawn. With a DirtyRects tracker only
+        # the areas behind last frame's sprites get their background back.
+        # Moving objects are drawn a fraction alpha of the way through their
+        # last tick (see FixedStep).
+        screen = self.screen
+        session = self.session
+        # The brick layer is also the background, so it goes first
+        changed = self.brick_layer.sync(session.bricks)
+        if dirty is None or dirty.full or changed is None:
+            screen.blit(self.brick_layer.surface, (0, 0))
+            if dirty is not None:
+                dirty.invalidate()
+        else:
+            dirty.restore(screen, self.brick_layer.surface, changed)
+        drawn = [session.paddle.draw(screen, alpha), session.ball.draw(screen, alpha)]
+        for extra_ball in session.additional_balls:
+            drawn.append(extra_ball.draw(screen, alpha))
+        for power_up in session.power_ups:
+            drawn.append(power_up.draw(screen, alpha))
+        for laser in session.lasers:
+            drawn.append(laser.draw(screen, alpha))
+        return drawn
+
+    def draw_hud(self):
+        screen = self.screen
+        session = self.session
+        # Level indicator
+        drawn = [text_cache.draw_counter(screen, game_font, "Level ", session.current_level + 1,
+                                         (255, 255, 255), midtop=(screen_width // 2, 10))]
+
+        # Score text, positioned right after the pause button
+        drawn.append(text_cache.draw_counter(screen, game_font, "Score: ", session.score,
+                                             (255, 255, 255), topleft=(140, 10)))
 
-    # --- Drawing and Updating based on Game State ---
-    screen.fill(BG_COLOR)
+        # Lives
+        drawn.append(text_cache.draw_counter(screen, game_font, "Lives: ", session.lives,
+                                             (255, 255, 255), topright=(screen_width - 10 - 50, 10)))
+        return drawn
 
-    # Main Menu
-    if game_state == 'main_menu':
+    def draw_main_menu(self, mouse_pos):
+        screen = self.screen
         # Draw title
-        title_surface = title_font.render("ARKANOID", True, (255, 255, 255))
+        title_surface = text_cache.render(title_font, "ARKANOID", (255, 255, 255))
         title_rect = title_surface.get_rect(center=(screen_width / 2, 180))
         screen.blit(title_surface, title_rect)
-        
+
         # Draw the play button
         play_hover = is_button_hovered(play_button_rect, mouse_pos)
         draw_button(screen, play_button_rect, "Play", play_hover)
-        
+
         # Draw the exit button
         exit_hover = is_button_hovered(exit_button_rect, mouse_pos)
         draw_button(screen, exit_button_rect, "Exit", exit_hover, is_reset=True)
-        
+
         # Show resume indicator if there's a saved game
-        if has_paused_game:
-            resume_info = message_font.render("(You have a game in progress)", True, (200, 200, 200))
+        if self.has_paused_game:
+            resume_info = text_cache.render(message_font, "(You have a game in progress)", (200, 200, 200))
             resume_rect = resume_info.get_rect(center=(screen_width / 2, 420))
             screen.blit(resume_info, resume_rect)
 
-    # Level Select Screen
-    elif game_state == 'level_select':
+    def draw_level_select(self, mouse_pos):
+        screen = self.screen
         # Draw title
-        title_surface = game_font.render("Select Level", True, (255, 255, 255))
+        title_surface = text_cache.render(game_font, "Select Level", (255, 255, 255))
         title_rect = title_surface.get_rect(center=(screen_width / 2, 50))
         screen.blit(title_surface, title_rect)
-        
+
         # Draw level selection buttons
         for button in level_buttons:
             hover = is_button_hovered(button["rect"], mouse_pos)
             draw_button(screen, button["rect"], button["text"], hover)
-            
+
         # Draw back button
         back_hover = is_button_hovered(back_button_rect, mouse_pos)
         draw_button(screen, back_button_rect, "Back", back_hover)
 
-    # Gameplay
-    elif game_state == 'playing':
-        # --- Update all game objects ---
-        paddle.update()
-        keys = pygame.key.get_pressed()
-        ball_status, collision_object = ball.update(paddle, keys[pygame.K_SPACE])
-        
-        # Update all additional balls
-        balls_to_remove = []
-        for i, extra_ball in enumerate(additional_balls):
-            status, collision = extra_ball.update(paddle, keys[pygame.K_SPACE])
-            if status == 'lost':
-                balls_to_remove.append(i)
-            elif collision in ['wall', 'paddle']:
-                if not is_muted:
-                    bounce_sound.play()
-                for _ in range(3):
-                    particles.append(Particle(extra_ball.rect.centerx, extra_ball.rect.centery, 
-                                              (255, 255, 0), 1, 2, 1, 2, 0))
-        
-        # Remove lost balls
-        for i in reversed(balls_to_remove):
-            del additional_balls[i]
-
-        if ball_status == 'lost':
-            # Only lose a life if there are no additional balls
-            if not additional_balls:
-                lives -= 1
-                if lives <= 0:
-                    game_state = 'game_over'
-                    create_game_over_explosion()  # Create explosion effect
-                    has_paused_game = False  # Clear paused game when game over
-                    if not is_muted:
-                        game_over_sound.play()
-                else:
-                    # Use safe ball reset
-                    safe_reset_ball(ball, bricks, paddle)
-                    paddle.reset()
-            else:
-                # If we have additional balls, just remove the main ball
-                # and make one of the additional balls the new main ball
-                ball = additional_balls.pop(0)
-                
-        elif collision_object in ['wall', 'paddle']:
-            if not is_muted:
-                bounce_sound.play()
-            for _ in range(5):
-                particles.append(Particle(ball.rect.centerx, ball.rect.centery, (255, 255, 0), 1, 3, 1, 3, 0))
-
-        # Ball collision with bricks - main ball
-        points, new_power_up = check_ball_brick_collision(ball, bricks, power_ups, score, particles, is_muted)
-        score += points
-        if new_power_up:
-            power_ups.append(new_power_up)
-        
-        # Ball collision with bricks - additional balls
-        for extra_ball in additional_balls:
-            points, new_power_up = check_ball_brick_collision(extra_ball, bricks, power_ups, score, particles, is_muted)
-            score += points
-            if new_power_up:
-                power_ups.append(new_power_up)
-        
-        for power_up in power_ups[:]:
-            power_up.update()
-            if power_up.rect.top > screen_height:
-                power_ups.remove(power_up)
-            elif paddle.rect.colliderect(power_up.rect):
-                display_message = PowerUp.PROPERTIES[power_up.type]['message']
-                message_timer = 120
-                if not is_muted:
-                    powerup_sound.play()
-                
-                # Handle the power-up effects
-                if power_up.type == 'multi':
-                    # Create 2 new balls
-                    for _ in range(2):
-                        additional_balls.append(create_multi_ball(ball))
-                elif power_up.type == 'extra_life':
-                    lives += 1
-                elif power_up.type in ['grow', 'laser', 'glue', 'shrink']:
-                    paddle.activate_power_up(power_up.type)
-                elif power_up.type in ['slow', 'fast', 'strong']:
-                    ball.activate_power_up(power_up.type)
-                    # Apply to all additional balls too
-                    for extra_ball in additional_balls:
-                        extra_ball.activate_power_up(power_up.type)
-                
-                power_ups.remove(power_up)
-        
-        for laser in lasers[:]:
-            laser.update()
-            if laser.rect.bottom < 0:
-                lasers.remove(laser)
-            else:
-                for brick in bricks[:]:
-                    if laser.rect.colliderect(brick.rect):
-                        for _ in range(10):
-                            particles.append(Particle(brick.rect.centerx, brick.rect.centery, brick.color, 1, 3, 1, 3, 0.05))
-                        bricks.remove(brick)
-                        lasers.remove(laser)
-                        score += 10
-                        if not is_muted:
-                            brick_break_sound.play()
-                        break
-        
-        if not bricks:
-            # If current level is not the last one, advance to next level
-            if current_level < len(LEVELS) - 1:
-                current_level += 1
-                paddle.reset()
-                level = LEVELS[current_level]
-                bricks = level["create_function"](**level["args"])
-                display_message = f"{level['name']}"
-                message_timer = 180
-                power_ups.clear()
-                lasers.clear()
-                additional_balls.clear()  # Clear additional balls between levels
-                # Use safe ball reset for next level
-                safe_reset_ball(ball, bricks, paddle)
-            else:
-                game_state = 'you_win'
-                has_paused_game = False  # Clear paused game when win
+    def draw_playing(self, mouse_pos, dirty=None, alpha=1.0):
+        screen = self.screen
+        ball = self.session.ball
+        paddle = self.session.paddle
+        additional_balls = self.session.additional_balls
 
         # --- Draw all game objects ---
-        paddle.draw(screen)
-        ball.draw(screen)
-        for extra_ball in additional_balls:
-            extra_ball.draw(screen)
-        for brick in bricks:
-            brick.draw(screen)
-        for power_up in power_ups:
-            power_up.draw(screen)
-        for laser in lasers:
-            laser.draw(screen)
-        
+        drawn = self.draw_game_objects(dirty, alpha)
+
         # --- Draw UI ---
-        # Level indicator
-        level_text = game_font.render(f"Level {current_level + 1}", True, (255, 255, 255))
-        screen.blit(level_text, (screen_width // 2 - level_text.get_width() // 2, 10))
-        
-        # Score text
-        score_text = game_font.render(f"Score: {score}", True, (255, 255, 255))
-        screen.blit(score_text, (140, 10))  # Positioned right after the pause button
-        
-        # Lives
-        lives_text = game_font.render(f"Lives: {lives}", True, (255, 255, 255))
-        screen.blit(lives_text, (screen_width - lives_text.get_width() - 10 - 50, 10))
-        
+        drawn += self.draw_hud()
+
         # Pause button
         hover = is_button_hovered(pause_button_rect, mouse_pos)
-        draw_button(screen, pause_button_rect, "Pause", hover)
-        
+        drawn.append(draw_button(screen, pause_button_rect, "Pause", hover))
+
         # Active power-ups indicators
         active_powers = []
         if ball.is_slowed:
@@ -814,149 +596,266 @@ while True:
             active_powers.append(("Glue", (255, 255, 0)))
         if paddle.has_shrink:
             active_powers.append(("Shrink", (255, 0, 0)))
-        
+
         # Display active power-ups in bottom-left corner
         for i, (power_name, power_color) in enumerate(active_powers):
-            power_text = message_font.render(power_name, True, power_color)
-            screen.blit(power_text, (10, screen_height - 30 - i * 25))
+            power_text = text_cache.render(message_font, power_name, power_color)
+            drawn.append(screen.blit(power_text, (10, screen_height - 30 - i * 25)))
 
         # Display ball count if there are multiple balls
         if additional_balls:
-            ball_count_text = message_font.render(f"Balls: {len(additional_balls) + 1}", True, (0, 255, 255))
-            screen.blit(ball_count_text, (screen_width - 100, screen_height - 30))
-
-    # Pause Screen
-    elif game_state == 'paused':
-        # First draw the game screen underneath
-        paddle.draw(screen)
-        ball.draw(screen)
-        for extra_ball in additional_balls:
-            extra_ball.draw(screen)
-        for brick in bricks:
-            brick.draw(screen)
-        for power_up in power_ups:
-            power_up.draw(screen)
-        for laser in lasers:
-            laser.draw(screen)
-        
-        # Draw UI elements from the game
-        level_text = game_font.render(f"Level {current_level + 1}", True, (255, 255, 255))
-        screen.blit(level_text, (screen_width // 2 - level_text.get_width() // 2, 10))
-        score_text = game_font.render(f"Score: {score}", True, (255, 255, 255))
-        screen.blit(score_text, (140, 10))
-        lives_text = game_font.render(f"Lives: {lives}", True, (255, 255, 255))
-        screen.blit(lives_text, (screen_width - lives_text.get_width() - 10 - 50, 10))
-        
-        # Draw semi-transparent overlay
-        draw_pause_overlay(screen)
-        
-        # Draw pause menu title
-        pause_title = title_font.render("PAUSED", True, (255, 255, 255))
-        pause_title_rect = pause_title.get_rect(center=(screen_width / 2, 120))
-        screen.blit(pause_title, pause_title_rect)
-        
-        # Draw pause menu buttons
-        # Resume button
+            drawn.append(text_cache.draw_counter(screen, message_font, "Balls: ", len(additional_balls) + 1,
+                                                 (0, 255, 255), topleft=(screen_width - 100, screen_height - 30)))
+        return drawn
+
+    def draw_paused(self, mouse_pos):
+        # Nothing moves while paused, so the game frame (with the overlay
+        # and title already blended in) is captured once and the screen is
+        # only redrawn when a button's hover state or the mute icon changes.
+        screen = self.screen
+        if self.pause_backdrop is None:
+            # First draw the game screen underneath
+            self.draw_game_objects()
+
+            # Draw UI elements from the game
+            self.draw_hud()
+
+            # Draw semi-transparent overlay
+            draw_pause_overlay(screen)
+
+            # Draw pause menu title
+            pause_title = text_cache.render(title_font, "PAUSED", (255, 255, 255))
+            pause_title_rect = pause_title.get_rect(center=(screen_width / 2, 120))
+            screen.blit(pause_title, pause_title_rect)
+
+            # Messages and particles are frozen along with the game
+            if self.is_message_shown():
+                self.draw_message()
+            self.session.particles.draw(screen)
+
+            self.pause_backdrop = screen.copy()
+            self.pause_view = None
+
         resume_hover = is_button_hovered(pause_resume_button_rect, mouse_pos)
-        draw_button(screen, pause_resume_button_rect, "Resume", resume_hover, is_resume=True)
-        
-        # Level select button
         level_select_hover = is_button_hovered(pause_level_select_button_rect, mouse_pos)
-        draw_button(screen, pause_level_select_button_rect, "Level Select", level_select_hover)
-        
-        # Exit button
         exit_hover = is_button_hovered(pause_exit_button_rect, mouse_pos)
+        view = (resume_hover, level_select_hover, exit_hover, self.is_muted, self.save_slots.version)
+        if view == self.pause_view:
+            return
+        self.pause_view = view
+        screen.blit(self.pause_backdrop, (0, 0))
+
+        # Draw pause menu buttons
+        draw_button(screen, pause_resume_button_rect, "Resume", resume_hover, is_resume=True)
+        draw_button(screen, pause_level_select_button_rect, "Level Select", level_select_hover)
         draw_button(screen, pause_exit_button_rect, "Exit", exit_hover, is_reset=True)
+        self.draw_save_slots()
+
+        draw_mute_button(screen, self.is_muted)
+        pygame.display.flip()
+
+    def draw_save_slots(self):
+        screen = self.screen
+        hint = text_cache.render(message_font, f"1-{SAVE_SLOT_COUNT}: save    Shift+1-{SAVE_SLOT_COUNT}: load",
+                                 (200, 200, 200))
+        screen.blit(hint, hint.get_rect(center=(screen_width / 2, 415)))
+        for i in range(SAVE_SLOT_COUNT):
+            slot = self.save_slots.get(str(i + 1))
+            if slot is None:
+                text = f"{i + 1}: empty"
+            else:
+                text = f"{i + 1}: {LEVELS[slot.level]['name']}, score {slot.score}, lives {slot.lives}"
+            surface = text_cache.render(message_font, text, (255, 255, 255))
+            screen.blit(surface, surface.get_rect(center=(screen_width / 2, 445 + i * 24)))
 
-    # Game Over Screen
-    elif game_state == 'game_over':
+    def draw_game_over(self, mouse_pos, ticks=1):
+        screen = self.screen
         # Draw a dark red background
         screen.fill(GAME_OVER_BG_COLOR)
-        
+
         # Update game over particles
-        if game_over_time > 0:
-            game_over_time -= 1
-            for particle in game_over_particles[:]:
-                particle.update()
-                if particle.size <= 0:
-                    game_over_particles.remove(particle)
-                    
+        if pygame.time.get_ticks() < self.game_over_until:
+            for _ in range(ticks):
+                self.game_over_particles.update()
+
             # Draw game over particles
-            for particle in game_over_particles:
-                particle.draw(screen)
-        
+            self.game_over_particles.draw(screen)
+
         # Draw flashing GAME OVER text
         flash_intensity = int(128 + 127 * math.sin(pygame.time.get_ticks() * 0.01))
         game_over_color = (255, flash_intensity, flash_intensity)
-        
+
+        # (not cached, the color changes every frame)
         game_over_text = big_font.render("GAME OVER", True, game_over_color)
         game_over_rect = game_over_text.get_rect(center=(screen_width / 2, 180))
         screen.blit(game_over_text, game_over_rect)
-        
+
         # Level text
-        level_text = game_font.render(f"Level {current_level + 1}", True, (255, 200, 200))
-        level_rect = level_text.get_rect(center=(screen_width / 2, 240))
-        screen.blit(level_text, level_rect)
-        
+        text_cache.draw_counter(screen, game_font, "Level ", self.session.current_level + 1,
+                                (255, 200, 200), center=(screen_width / 2, 240))
+
         # Final score
-        score_text = game_font.render(f"Final Score: {score}", True, (255, 200, 200))
-        score_rect = score_text.get_rect(center=(screen_width / 2, 280))
-        screen.blit(score_text, score_rect)
-        
+        text_cache.draw_counter(screen, game_font, "Final Score: ", self.session.score,
+                                (255, 200, 200), center=(screen_width / 2, 280))
+
         # Draw buttons
         retry_hover = is_button_hovered(game_over_retry_button_rect, mouse_pos)
         draw_button(screen, game_over_retry_button_rect, "Retry Level", retry_hover, is_resume=True)
-        
+
         menu_hover = is_button_hovered(game_over_menu_button_rect, mouse_pos)
         draw_button(screen, game_over_menu_button_rect, "Main Menu", menu_hover)
 
-    # You Win Screen
-    elif game_state == 'you_win':
-        firework_timer -= 1
-        if firework_timer <= 0:
-            fireworks.append(Firework(screen_width, screen_height))
-            firework_timer = random.randint(20, 50)
-        
-        for firework in fireworks[:]:
-            firework.update()
-            if firework.is_dead():
-                fireworks.remove(firework)
-        
-        for firework in fireworks:
+    def draw_you_win(self, mouse_pos, ticks=1):
+        screen = self.screen
+        for _ in range(ticks):
+            self.firework_timer -= 1
+            if self.firework_timer <= 0:
+                self.fireworks.append(Firework(screen_width, screen_height))
+                self.firework_timer = random.randint(20, 50)
+
+            for firework in self.fireworks[:]:
+                firework.update()
+                if firework.is_dead():
+                    self.fireworks.remove(firework)
+
+        for firework in self.fireworks:
             firework.draw(screen)
 
         # You Win text
-        win_text = big_font.render("YOU WIN!", True, (100, 255, 100))
+        win_text = text_cache.render(big_font, "YOU WIN!", (100, 255, 100))
         win_rect = win_text.get_rect(center=(screen_width / 2, 180))
         screen.blit(win_text, win_rect)
-        
+
         # Final score
-        score_surface = game_font.render(f"Final Score: {score}", True, (255, 255, 255))
-        score_rect = score_surface.get_rect(center=(screen_width / 2, 260))
-        screen.blit(score_surface, score_rect)
-        
+        text_cache.draw_counter(screen, game_font, "Final Score: ", self.session.score,
+                                (255, 255, 255), center=(screen_width / 2, 260))
+
         # Return to main menu message
-        restart_surface = game_font.render("Press SPACE to return to Menu", True, (255, 255, 255))
+        restart_surface = text_cache.render(game_font, "Press SPACE to return to Menu", (255, 255, 255))
         restart_rect = restart_surface.get_rect(center=(screen_width / 2, 320))
         screen.blit(restart_surface, restart_rect)
 
-    # --- Update effects and messages (these run in all states) ---
-    if message_timer > 0:
-        message_timer -= 1
-        message_surface = message_font.render(display_message, True, (255, 255, 255))
+    def show_message(self, text, duration):
+        self.display_message = text
+        self.message_until = pygame.time.get_ticks() + duration
+
+    def is_message_shown(self):
+        return pygame.time.get_ticks() < self.message_until
+
+    def draw_message(self):
+        message_surface = text_cache.render(message_font, self.display_message, (255, 255, 255))
         message_rect = message_surface.get_rect(center=(screen_width / 2, screen_height - 60))
-        screen.blit(message_surface, message_rect)
-        
-    for particle in particles[:]:
-        particle.update()
-        if particle.size <= 0:
-            particles.remove(particle)
-    for particle in particles:
-        particle.draw(screen)
-
-    # Draw mute button (shown in all game states)
-    draw_mute_button(screen)
-
-    # --- Final Display Update ---
-    pygame.display.flip()
-    clock.tick(60)
\ No newline at end of file
+        return self.screen.blit(message_surface, message_rect)
+
+    def run_frame(self, elapsed_ms=1000 / SIM_RATE):
+        screen = self.screen
+        # Get mouse position for button hover effects
+        mouse_pos = pygame.mouse.get_pos()
+
+        for event in pygame.event.get():
+            self.handle_event(event)
+
+        # Only the playing screen tracks dirty rects, every other screen
+        # (and the first playing frame after one) pushes the whole buffer
+        dirty = self.dirty_rects if DIRTY_RECT_UPDATES else None
+        if dirty is not None and (self.game_state != 'playing' or self.last_drawn_state != 'playing'):
+            dirty.invalidate()
+        if self.game_state == 'paused' and self.last_drawn_state != 'paused':
+            self.pause_view = None  # Coming back from another screen, redraw
+        if self.game_state == 'playing' and self.last_drawn_state == 'paused':
+            # The message was frozen on the pause screen, give it its time back
+            self.message_until += pygame.time.get_ticks() - self.paused_at
+        # Time spent on another screen (including blocked in event.wait)
+        # isn't owed to this one, so the first frame of a screen runs no ticks
+        if self.game_state != self.last_drawn_state:
+            self.sim_clock.reset()
+            self.fire_pressed = False  # Nor is a press on the way out of the game
+            elapsed_ms = 0
+        self.last_drawn_state = self.game_state
+        ticks = self.sim_clock.advance(elapsed_ms)
+        drawn = []
+
+        # The pause screen is a frozen frame that presents itself only when
+        # something on it changes, and effects and messages don't advance
+        if self.game_state == 'paused':
+            self.draw_paused(mouse_pos)
+            return
+
+        # --- Drawing and Updating based on Game State ---
+        # (the playing screen paints its own background)
+        if self.game_state != 'playing':
+            screen.fill(BG_COLOR)
+
+        if self.game_state == 'main_menu':
+            self.draw_main_menu(mouse_pos)
+        elif self.game_state == 'level_select':
+            self.draw_level_select(mouse_pos)
+        elif self.game_state == 'playing':
+            rewinding = pygame.key.get_pressed()[REWIND_KEY]
+            frame_events = []
+            for _ in range(ticks):
+                if rewinding:
+                    self.rewind_playing()
+                    continue
+                self.update_playing(frame_events)
+                if self.game_state != 'playing':
+                    break
+            self.play_event_sounds(frame_events)
+            # Interpolating runs forward from each object's previous position,
+            # so a rewinding game is drawn where the restored tick left it
+            alpha = 1.0 if rewinding else self.sim_clock.alpha
+            drawn = self.draw_playing(mouse_pos, dirty, alpha)
+        elif self.game_state == 'game_over':
+            self.draw_game_over(mouse_pos, ticks)
+        elif self.game_state == 'you_win':
+            self.draw_you_win(mouse_pos, ticks)
+
+        # --- Update effects and messages (these run in all states) ---
+        if self.is_message_shown():
+            drawn.append(self.draw_message())
+
+        for _ in range(ticks):
+            self.session.update_effects()
+        drawn += self.session.particles.draw(screen)
+
+        # Draw mute button (shown in all game states)
+        drawn.append(draw_mute_button(screen, self.is_muted))
+
+        # --- Final Display Update ---
+        if dirty is not None:
+            dirty.add(drawn)
+            dirty.present()
+        else:
+            pygame.display.flip()
+
+    def idle_timeout(self):
+        # How long run() may wait for input before drawing the next frame,
+        # in ms: None while something is animating, 0 to wait for input only
+        if self.game_state == 'paused':
+            return 0  # Frozen frame, see draw_paused
+        if self.game_state in ['playing', 'you_win'] or len(self.session.particles):
+            return None
+        now = pygame.time.get_ticks()
+        if self.game_state == 'game_over':
+            return None if now < self.game_over_until else GAME_OVER_FLASH_INTERVAL
+        if now < self.message_until:
+            return self.message_until - now  # Wake up to clear the message
+        return 0
+
+    # -- Main Game Loop --
+    def run(self):
+        elapsed_ms = 1000 / SIM_RATE
+        while True:
+            self.run_frame(elapsed_ms)
+            timeout = self.idle_timeout()
+            if timeout is not None:
+                # Sleep until something happens (or the next animation
+                # frame is due) instead of redrawing an unchanged screen
+                event = pygame.event.wait(timeout)
+                if event.type != pygame.NOEVENT:
+                    self.handle_event(event)
+            elapsed_ms = clock.tick(MAX_RENDER_FPS)
+
+
+if __name__ == '__main__':
+    ArkanoidApp(screen).run()
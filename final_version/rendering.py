@@ -0,0 +1,130 @@
+import pygame
+from collections import OrderedDict
+
+# -- Cached brick layer --
+# The brick field is drawn once into an off-screen surface that doubles as
+# the background of the playing and pause screens. When bricks die only
+# their rects are painted over, so drawing the bricks costs one blit per
+# frame however many there are.
+class BrickLayer:
+    def __init__(self, size, background_color):
+        self.surface = pygame.Surface(size)
+        self.background_color = background_color
+        self.store = None
+        self.version = None
+        self.alive = None
+
+    def sync(self, store):
+        # Rebuild for a new level, repaint the bricks that died (or came
+        # back, for a restored or rewound game on the same layout)
+        # otherwise. Returns the rects that changed, or None after a rebuild.
+        changed = []
+        if self.store is None or store.xs is not self.store.xs:
+            self.surface.fill(self.background_color)
+            store.draw(self.surface)
+            self.alive = bytearray(store.alive)
+            changed = None
+        elif store is not self.store or store.version != self.version:
+            for i, was_alive in enumerate(self.alive):
+                if was_alive != store.alive[i]:
+                    rect = self.surface.fill(self.background_color, store.rect(i))
+                    if store.alive[i]:
+                        pygame.draw.rect(self.surface, store.color(i), rect)
+                    changed.append(rect)
+                    self.alive[i] = store.alive[i]
+        self.store = store
+        self.version = store.version
+        return changed
+
+
+# -- Dirty rectangle tracking --
+# Instead of flipping the whole 800x600 buffer, a screen that opts in
+# restores the background under last frame's sprites, records the rects it
+# draws this frame and pushes only old + new rects to the display.
+class DirtyRects:
+    def __init__(self):
+        self.previous = []
+        self.current = []
+        self.full = True  # The next present() must push the whole screen
+
+    def add(self, rects):
+        if isinstance(rects, pygame.Rect):
+            self.current.append(rects)
+        else:
+            self.current.extend(rects)
+
+    def invalidate(self):
+        self.full = True
+
+    def restore(self, screen, background, rects=()):
+        # Paint the background back over last frame's sprites (and any extra
+        # rects whose background changed), and mark the extra rects dirty
+        for rect in self.previous:
+            screen.blit(background, rect, rect)
+        for rect in rects:
+            screen.blit(background, rect, rect)
+            self.current.append(rect)
+
+    def present(self):
+        if self.full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.previous + self.current)
+        self.previous = self.current
+        self.current = []
+        self.full = False
+
+
+# -- Rendered text cache --
+# Font rasterization is one of the most expensive things a frame does, yet
+# almost every string on screen is the same from one frame to the next.
+# Rendered surfaces are kept keyed by (font, text, color) and the least
+# recently used one is dropped once the cache is full. Numbers that change
+# all the time (score, lives, ...) are drawn from a per-font digit atlas
+# instead, so a new score never rasterizes anything.
+COUNTER_GLYPHS = '0123456789-'
+
+
+class TextCache:
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.glyphs = {}  # (font, color) -> {char: surface}
+
+    def render(self, font, text, color):
+        key = (font, text, tuple(color))
+        surface = self.entries.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.entries[key] = surface
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return surface
+
+    def _glyph_atlas(self, font, color):
+        key = (font, tuple(color))
+        atlas = self.glyphs.get(key)
+        if atlas is None:
+            atlas = {char: font.render(char, True, color) for char in COUNTER_GLYPHS}
+            self.glyphs[key] = atlas
+        return atlas
+
+    def draw_counter(self, screen, font, label, value, color, **anchor):
+        # Blit label followed by value, positioned like Surface.get_rect
+        # (e.g. center=..., topright=...). Returns the rect that was drawn.
+        label_surface = self.render(font, label, color)
+        atlas = self._glyph_atlas(font, color)
+        digits = [atlas[char] for char in str(value)]
+        width = label_surface.get_width() + sum(glyph.get_width() for glyph in digits)
+        height = max([label_surface.get_height()] + [glyph.get_height() for glyph in digits])
+        rect = pygame.Rect(0, 0, width, height)
+        for name, position in anchor.items():
+            setattr(rect, name, position)
+        x = rect.x + label_surface.get_width()
+        screen.blit(label_surface, rect.topleft)
+        for glyph in digits:
+            screen.blit(glyph, (x, rect.y))
+            x += glyph.get_width()
+        return rect
@@ -0,0 +1,230 @@
+import struct
+import sys
+import time
+from bisect import bisect_right
+from game_session import GameSession, FrameInput
+from snapshot import take_snapshot, restore_snapshot
+
+# -- Input replays --
+# A game is fully determined by its seed, starting level and the inputs of
+# every simulation tick, so that is all a replay stores. Each tick's input
+# is a bitmask; runs of identical masks are written as
+# (run length varint, mask XOR previous mask), which turns minutes of play
+# into a few KB.
+#
+# Long games also carry a keyframe (a snapshot.py snapshot, without the
+# particles) every KEYFRAME_INTERVAL ticks, so seek() only has to restore
+# the nearest one and simulate the few ticks after it instead of replaying
+# from the start.
+#
+# File layout (little endian):
+#   b'ARKR', version u8, flags u8, seed u32, level u8, width u16,
+#   height u16, tick count u32, then the runs, then (version 2) the
+#   keyframe count u32, an index of (tick u32, offset u32, size u32)
+#   entries and the keyframes, offsets counting from the first keyframe.
+MAGIC = b'ARKR'
+VERSION = 2
+HEADER = struct.Struct('<4sBBIBHHI')
+KEYFRAME_ENTRY = struct.Struct('<III')
+KEYFRAME_INTERVAL = 600  # Ticks, 10 seconds of play
+FAST_FORWARD_MIN_RUN = 8  # Shorter runs of one input are stepped, skipping ahead wouldn't pay
+
+LEFT = 1
+RIGHT = 2
+SPACE = 4
+FIRE = 8
+PAUSE = 16  # The player paused before this tick (doesn't affect the game)
+
+SWEPT_COLLISIONS = 1  # Header flag for collision_mode='swept'
+
+
+def encode_input(inputs, paused=False):
+    return ((LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) |
+            (SPACE if inputs.space else 0) | (FIRE if inputs.fire else 0) |
+            (PAUSE if paused else 0))
+
+def decode_input(mask):
+    return FrameInput(bool(mask & LEFT), bool(mask & RIGHT), bool(mask & SPACE), bool(mask & FIRE))
+
+
+class Replay:
+    def __init__(self, seed, level_index=0, screen_width=800, screen_height=600,
+                 collision_mode='discrete', masks=None, keyframes=None):
+        self.seed = seed
+        self.level_index = level_index
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.collision_mode = collision_mode
+        self.masks = masks if masks is not None else bytearray()  # One input bitmask per tick
+        self.keyframes = keyframes if keyframes is not None else []  # (tick, snapshot), by tick
+
+    def __len__(self):
+        return len(self.masks)
+
+    def runs(self, start=0, end=None):
+        # (mask, length) for every run of identical inputs between two ticks
+        masks = self.masks
+        end = len(masks) if end is None else end
+        for i in range(start + 1, end + 1):
+            if i == end or masks[i] != masks[start]:
+                yield masks[start], i - start
+                start = i
+
+    def to_bytes(self):
+        flags = SWEPT_COLLISIONS if self.collision_mode == 'swept' else 0
+        out = bytearray(HEADER.pack(MAGIC, VERSION, flags, self.seed, self.level_index,
+                                    self.screen_width, self.screen_height, len(self.masks)))
+        previous = 0
+        for mask, length in self.runs():
+            _write_varint(out, length)
+            out.append(mask ^ previous)
+            previous = mask
+
+        out += struct.pack('<I', len(self.keyframes))
+        offset = 0
+        for tick, snapshot in self.keyframes:
+            out += KEYFRAME_ENTRY.pack(tick, offset, len(snapshot))
+            offset += len(snapshot)
+        for _, snapshot in self.keyframes:
+            out += snapshot
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("Not a replay file (too short)")
+        magic, version, flags, seed, level_index, width, height, ticks = HEADER.unpack_from(data)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError("Not a replay file, or an unsupported version")
+        masks = bytearray()
+        position = HEADER.size
+        mask = 0
+        try:
+            while len(masks) < ticks:
+                length, position = _read_varint(data, position)
+                mask ^= data[position]
+                position += 1
+                masks.extend(bytes((mask,)) * length)
+
+            keyframes = []
+            if version >= 2:
+                count, = struct.unpack_from('<I', data, position)
+                position += 4
+                start = position + count * KEYFRAME_ENTRY.size
+                for _ in range(count):
+                    tick, offset, size = KEYFRAME_ENTRY.unpack_from(data, position)
+                    position += KEYFRAME_ENTRY.size
+                    keyframes.append((tick, bytes(data[start + offset:start + offset + size])))
+        except (IndexError, struct.error):
+            raise ValueError("Replay file is truncated")
+        if len(masks) != ticks:
+            raise ValueError("Replay file is corrupt")
+        collision_mode = 'swept' if flags & SWEPT_COLLISIONS else 'discrete'
+        return cls(seed, level_index, width, height, collision_mode, masks, keyframes)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def new_session(self, effects=False):
+        return GameSession(self.screen_width, self.screen_height, self.level_index,
+                           effects=effects, collision_mode=self.collision_mode, seed=self.seed)
+
+    def play(self, effects=False):
+        # Run the recorded game as fast as possible and return the session
+        # in its final state
+        session = self.new_session(effects)
+        self.simulate(session, 0, len(self.masks))
+        return session
+
+    def seek(self, tick, effects=False):
+        # The session as it was after `tick` ticks, restored from the
+        # nearest keyframe at or before it
+        tick = max(0, min(tick, len(self.masks)))
+        session = self.new_session(effects)
+        start = 0
+        index = bisect_right([keyframe[0] for keyframe in self.keyframes], tick) - 1
+        if index >= 0:
+            start, snapshot = self.keyframes[index]
+            restore_snapshot(session, snapshot)
+        self.simulate(session, start, tick)
+        return session
+
+    def simulate(self, session, start, end):
+        # Feed the inputs of ticks start..end to a session that is at tick
+        # start, through the normal GameSession.step path. Long runs of one
+        # input go through fast_forward(), which is exactly equivalent.
+        for mask, length in self.runs(start, end):
+            inputs = decode_input(mask)
+            if length < FAST_FORWARD_MIN_RUN:
+                for _ in range(length):
+                    if session.state != 'playing':
+                        break
+                    session.step(inputs)
+                continue
+            while length > 0 and session.state == 'playing':
+                frames, _ = session.fast_forward(length, inputs)
+                length -= frames
+
+
+class InputRecorder:
+    # Collects the inputs of one game as the app steps its session. Call
+    # record() with each tick's input just before the session steps.
+    def __init__(self, session, keyframe_interval=KEYFRAME_INTERVAL):
+        self.session = session
+        self.keyframe_interval = keyframe_interval
+        self.replay = Replay(session.seed, session.current_level, session.screen_width,
+                             session.screen_height, session.collision_mode)
+        self.pause_pending = False
+
+    def record(self, inputs):
+        masks = self.replay.masks
+        if masks and len(masks) % self.keyframe_interval == 0:
+            self.replay.keyframes.append((len(masks), take_snapshot(self.session, include_effects=False)))
+        masks.append(encode_input(inputs, self.pause_pending))
+        self.pause_pending = False
+
+    def mark_pause(self):
+        self.pause_pending = True
+
+    def rewind(self, tick):
+        # The session was rolled back to `tick` (see rewind.py), so the
+        # inputs after it never happened
+        del self.replay.masks[tick:]
+        self.replay.keyframes = [keyframe for keyframe in self.replay.keyframes if keyframe[0] < tick]
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, position):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python replay.py <file.replay>")
+        sys.exit(1)
+    replay = Replay.load(sys.argv[1])
+    start = time.perf_counter()
+    session = replay.play()
+    elapsed = time.perf_counter() - start
+    print(f"{len(replay)} ticks (seed {replay.seed}, level {replay.level_index + 1}) "
+          f"replayed in {elapsed:.3f}s: {session.state}, level {session.current_level + 1}, "
+          f"score {session.score}, lives {session.lives}, hash {session.state_hash():08x}")
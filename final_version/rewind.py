@@ -0,0 +1,60 @@
+import zlib
+from collections import deque
+from snapshot import take_snapshot, restore_snapshot
+
+# -- Rewind buffer --
+# Keeps the state of the last few seconds of play, one entry per tick, so
+# the game can be rolled back a tick at a time. Every keyframe_interval
+# ticks (and whenever the number of balls, power-ups or lasers changes) a
+# full snapshot is kept; the ticks in between only store how they differ
+# from that keyframe: the two snapshots XORed together, which is almost all
+# zeros, then compressed. Restoring a tick is one decompress and one XOR
+# followed by restore_snapshot, whatever its distance from the keyframe.
+#
+# The buffer is a ring of `capacity` entries, so the oldest tick is dropped
+# as each new one comes in, and a keyframe is freed with the last tick that
+# depends on it. Particles are left out, a rewound game starts without them.
+REWIND_CAPACITY = 600  # Ticks, 10 seconds of play
+REWIND_KEYFRAME_INTERVAL = 60
+
+
+class RewindBuffer:
+    def __init__(self, capacity=REWIND_CAPACITY, keyframe_interval=REWIND_KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.entries = deque(maxlen=capacity)  # (keyframe, delta or None), oldest first
+        self.keyframe = None  # Keyframe the next delta is taken against
+        self.since_keyframe = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.keyframe = None
+
+    def push(self, session):
+        # Remember the session as it is now, call before each tick
+        snapshot = take_snapshot(session, include_effects=False)
+        keyframe = self.keyframe
+        if (keyframe is None or self.since_keyframe >= self.keyframe_interval or
+                len(snapshot) != len(keyframe)):
+            self.keyframe = snapshot
+            self.since_keyframe = 1
+            self.entries.append((snapshot, None))
+        else:
+            self.since_keyframe += 1
+            self.entries.append((keyframe, zlib.compress(_xor(snapshot, keyframe), 1)))
+
+    def pop(self, session):
+        # Put the session back to the last pushed tick and forget it.
+        # Returns False, leaving the session alone, when nothing is left.
+        if not self.entries:
+            return False
+        keyframe, delta = self.entries.pop()
+        restore_snapshot(session, keyframe if delta is None else _xor(keyframe, zlib.decompress(delta)))
+        self.keyframe = None  # Ticks pushed from here on start a new keyframe
+        return True
+
+
+def _xor(a, b):
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
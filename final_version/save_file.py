@@ -0,0 +1,154 @@
+import os
+import queue
+import struct
+import threading
+import zlib
+from collections import namedtuple
+
+# -- Save file --
+# The save slots (see save_slots.py) are kept on disk in a single file. It is
+# never written in place: a background thread writes the new contents to a
+# temporary file next to it and renames that over the old one, so a crash or
+# power cut leaves either the old file or the new one, never half of each,
+# and the game never waits on the disk. Opening the file only reads its
+# index; a slot's snapshot is read, checked against its CRC and decompressed
+# the first time it is loaded.
+#
+# File layout (little endian):
+#   b'ARKS', version u8, slot count u16, then per slot the name length u8,
+#   the name (UTF-8) and (frame u32, level u8, score i32, lives u16,
+#   offset u32, size u32, crc32 u32), then the zlib-compressed snapshots,
+#   offsets counting from the first one.
+MAGIC = b'ARKS'
+VERSION = 1
+HEADER = struct.Struct('<4sBH')
+ENTRY = struct.Struct('<IBiHIII')
+
+SaveEntry = namedtuple('SaveEntry', ['frame', 'level', 'score', 'lives', 'offset', 'size', 'crc'])
+
+
+class SaveFile:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}  # name -> SaveEntry of what is on disk
+        self.data_start = 0  # File offset of the first snapshot
+        self.lock = threading.Lock()  # Held while the file is read or replaced
+        self.jobs = queue.Queue()
+        self.writer = None
+
+    def read_index(self):
+        # Read and check the header and index, not the snapshots. Raises
+        # OSError if the file can't be read and ValueError if it is corrupt.
+        with self.lock, open(self.path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError("Not a save file (too short)")
+            magic, version, count = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("Not a save file, or an unsupported version")
+            entries = {}
+            for _ in range(count):
+                length = f.read(1)
+                name = f.read(length[0]) if length else b''
+                values = f.read(ENTRY.size)
+                if not length or len(name) < length[0] or len(values) < ENTRY.size:
+                    raise ValueError("Save file is truncated")
+                entries[name.decode('utf-8', 'replace')] = SaveEntry(*ENTRY.unpack(values))
+            data_start = f.tell()
+            for entry in entries.values():
+                if data_start + entry.offset + entry.size > file_size:
+                    raise ValueError("Save file is truncated")
+            self.entries = entries
+            self.data_start = data_start
+        return dict(entries)
+
+    def read_snapshot(self, name):
+        with self.lock:
+            data = self._read_compressed(name)
+        try:
+            return zlib.decompress(data)
+        except zlib.error:
+            raise ValueError(f"Save slot {name!r} is corrupt")
+
+    def _read_compressed(self, name):
+        entry = self.entries[name]
+        with open(self.path, 'rb') as f:
+            f.seek(self.data_start + entry.offset)
+            data = f.read(entry.size)
+        if len(data) != entry.size or zlib.crc32(data) != entry.crc:
+            raise ValueError(f"Save slot {name!r} is corrupt")
+        return data
+
+    def write(self, slots):
+        # Queue the slots to be written by the background thread. Slots that
+        # were never read from the file are copied over from it as they are.
+        job = []
+        for name in slots.names():
+            slot = slots.get(name)
+            snapshot = slots.snapshot(name) if slots.is_loaded(name) else None
+            job.append((name, slot.frame, slot.level, slot.score, slot.lives, snapshot))
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_jobs, name='save-writer', daemon=True)
+            self.writer.start()
+        self.jobs.put(job)
+
+    def flush(self):
+        # Wait until everything queued is on disk
+        if self.writer is not None:
+            self.jobs.join()
+
+    def _write_jobs(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                # Only the newest of several queued saves needs writing
+                while True:
+                    try:
+                        newer = self.jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    self.jobs.task_done()
+                    job = newer
+                self._write(job)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Could not write the save file. {e}")
+            finally:
+                self.jobs.task_done()
+
+    def _write(self, job):
+        with self.lock:
+            index = bytearray()
+            blobs = []
+            entries = {}
+            offset = 0
+            for name, frame, level, score, lives, snapshot in job:
+                if snapshot is not None:
+                    blob = zlib.compress(snapshot)
+                else:
+                    try:
+                        blob = self._read_compressed(name)
+                    except (OSError, ValueError) as e:
+                        # Leave a damaged slot out rather than lose every other save
+                        print(f"Warning: Dropping a save slot that can't be read. {e}")
+                        continue
+                entry = SaveEntry(frame, level, score, lives, offset, len(blob), zlib.crc32(blob))
+                encoded = name.encode('utf-8')
+                index.append(len(encoded))
+                index += encoded
+                index += ENTRY.pack(*entry)
+                blobs.append(blob)
+                entries[name] = entry
+                offset += len(blob)
+
+            index[:0] = HEADER.pack(MAGIC, VERSION, len(entries))
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(index)
+                for blob in blobs:
+                    f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self.entries = entries
+            self.data_start = len(index)
@@ -0,0 +1,72 @@
+from collections import namedtuple
+from snapshot import take_snapshot, restore_snapshot, read_header, split_snapshot, join_snapshot
+
+# -- Named save slots --
+# Any number of saved games, each under a name. A slot never holds a copy of
+# the level: bricks are kept as the indices of the ones destroyed since the
+# level was built (the layout itself comes from the level index and is
+# shared by every slot and the running game). Those and the random
+# generator's 2.5 KB state are shared with any other slot where they are
+# the same. Slots are immutable: saving under an existing name replaces the
+# slot and loading one restores a copy into the session, so neither side
+# can change the other.
+#
+# Slots can also come from a save file (see save_file.py): only its index is
+# read up front, and a slot's snapshot is read in the first time it is used.
+SaveSlot = namedtuple('SaveSlot', ['frame', 'level', 'score', 'lives', 'rest', 'rng', 'killed'])
+
+
+class SaveSlots:
+    def __init__(self, source=None):
+        self.slots = {}  # name -> SaveSlot
+        self.source = source  # SaveFile the slots below are read from when first used
+        self.unread = dict(source.entries) if source is not None else {}  # name -> SaveEntry
+        self.version = 0  # Bumped on every change so screens can tell the slots changed
+
+    def __contains__(self, name):
+        return name in self.slots or name in self.unread
+
+    def __len__(self):
+        return len(self.slots) + len(self.unread)
+
+    def names(self):
+        return list(self.unread) + list(self.slots)
+
+    def get(self, name):
+        # The slot, or the save file's entry for it (both have frame, level,
+        # score and lives) when it hasn't been read yet
+        slot = self.slots.get(name)
+        return slot if slot is not None else self.unread.get(name)
+
+    def is_loaded(self, name):
+        return name in self.slots
+
+    def save(self, name, session):
+        self.add_snapshot(name, take_snapshot(session, include_effects=False))
+
+    def load(self, name, session):
+        # Returns False, leaving the session alone, when there is no such slot
+        if name not in self:
+            return False
+        restore_snapshot(session, self.snapshot(name))
+        return True
+
+    def snapshot(self, name):
+        if name not in self.slots:
+            # Raises ValueError if the file has been damaged since
+            self.add_snapshot(name, self.source.read_snapshot(name))
+        slot = self.slots[name]
+        return join_snapshot(slot.rest, slot.rng, slot.killed)
+
+    def add_snapshot(self, name, snapshot):
+        # Also for snapshots taken elsewhere (e.g. read back from a file)
+        frame, _, level, _, score, lives = read_header(snapshot)
+        rest, rng, killed = split_snapshot(snapshot)
+        for slot in self.slots.values():
+            if slot.rng == rng:
+                rng = slot.rng
+            if slot.killed == killed:
+                killed = slot.killed
+        self.unread.pop(name, None)
+        self.slots[name] = SaveSlot(frame, level, score, lives, rest, rng, killed)
+        self.version += 1
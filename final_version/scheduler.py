@@ -0,0 +1,83 @@
+import heapq
+from itertools import count
+
+# -- Power-up expiry queue --
+# Paddles and balls remember the session tick at which each of their
+# power-ups wears off in a power_up_ends dict (0 when inactive). The queue
+# keeps those ticks in a heap so a frame only does work when something
+# actually expires. Entries are never removed when a power-up is renewed or
+# a ball is reset: an entry is simply ignored if its tick no longer matches
+# what the owner has stored.
+class TimerQueue:
+    def __init__(self):
+        self.heap = []
+        self.counter = count()  # Tie-breaker, owners aren't comparable
+
+    def clear(self):
+        self.heap.clear()
+
+    def schedule(self, owner, name):
+        heapq.heappush(self.heap, (owner.power_up_ends[name], next(self.counter), owner, name))
+
+    def schedule_all(self, owner):
+        for name, tick in owner.power_up_ends.items():
+            if tick:
+                self.schedule(owner, name)
+
+    def rebuild(self, owners):
+        self.clear()
+        for owner in owners:
+            self.schedule_all(owner)
+
+    def next_tick(self):
+        # Tick of the earliest pending expiry, or None
+        heap = self.heap
+        while heap and not _is_current(heap[0]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def expire(self, now):
+        # Wear off every power-up whose tick has come
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if _is_current(entry):
+                entry[2].expire_power_up(entry[3])
+
+
+def _is_current(entry):
+    tick, _, owner, name = entry
+    return owner.power_up_ends[name] == tick
+
+
+# -- Fixed simulation rate --
+# The game is simulated in fixed ticks of 1 / rate seconds whatever rate the
+# display is drawn at. Each drawn frame adds the real time that passed and
+# spends it on whole ticks. The part of a tick that is left over (alpha,
+# from 0 to 1) is used to draw objects between their last two positions.
+# Time is counted in ms * rate so rounding errors never build up.
+class FixedStep:
+    def __init__(self, rate=60, max_steps=5):
+        self.rate = rate
+        self.max_steps = max_steps  # Ticks a single frame may catch up on
+        self.accumulator = 0
+
+    def reset(self):
+        self.accumulator = 0
+
+    def advance(self, elapsed_ms):
+        # Number of ticks to simulate for elapsed_ms of real time. When the
+        # simulation falls further behind than max_steps the rest is
+        # dropped, so the game slows down instead of stalling to catch up.
+        self.accumulator += int(elapsed_ms * self.rate)
+        steps = self.accumulator // 1000
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator %= 1000
+        else:
+            self.accumulator -= steps * 1000
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / 1000
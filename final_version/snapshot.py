@@ -0,0 +1,254 @@
+import random
+import struct
+from array import array
+import numpy as np
+import pygame
+from game_objects import Ball, PowerUp, Laser
+from bricks import BrickStore, BrickGrid
+from levels import LEVELS, build_level
+
+# -- Session snapshots --
+# Packs the whole state of a GameSession (frame, score, paddle, balls,
+# power-ups, lasers, which bricks are left, power-up expiry ticks, both RNG
+# streams and the particles) into one immutable bytes object, and restores
+# a session from one. Bricks are stored as their alive mask only; the
+# layout comes from the level index and is shared, never copied. Everything
+# is plain struct data, so snapshots are safe to load from files other
+# people send in.
+SNAPSHOT_VERSION = 1
+PADDLE_POWER_UPS = ('grow', 'laser', 'glue', 'shrink')
+BALL_POWER_UPS = ('slow', 'fast', 'strong')
+POWER_UP_NAMES = tuple(PowerUp.PROPERTIES)
+STATES = ('playing', 'game_over', 'you_win')
+PARTICLE_FIELDS = ('x', 'y', 'vx', 'vy', 'size', 'gravity')
+
+# version, frame, seed, level, state, score, lives,
+# counts (balls, power-ups, lasers, bricks, particles)
+_HEAD = struct.Struct('<BIIBBihHHHHI')
+_RNG = struct.Struct('<625I')  # Mersenne Twister state
+_GAUSS = struct.Struct('<?d')  # has gauss_next, gauss_next
+_EFFECTS_RNG = struct.Struct('<16s16sBI')  # PCG64 state, increment, has_uint32, uinteger
+_PADDLE = struct.Struct('<7h3?4I')  # rect, width, prev_position, laser/glue/shrink, power_up_ends
+_BALL = struct.Struct('<6h2d4?3I')  # rect, prev_position, speed, glued/slowed/fast/strong, power_up_ends
+_POWER_UP = struct.Struct('<B4h')  # type, position, prev_position
+_LASER = struct.Struct('<4h')  # position, prev_position
+
+_LEVEL_LAYOUTS = {}  # level index -> (store, grid) to share the layout with
+# Scratch generators a snapshot's states are tried on before it is restored
+_RNG_CHECK = random.Random(0)
+_EFFECTS_RNG_CHECK = np.random.PCG64(0)
+
+
+def take_snapshot(session, include_effects=True):
+    # Without effects the particles are left out (restoring clears them),
+    # for snapshots that are only ever simulated, not drawn
+    paddle = session.paddle
+    balls = session.balls()
+    alive = session.bricks.alive
+    particles = session.particles
+    count = particles.count if include_effects else 0
+    parts = [_HEAD.pack(SNAPSHOT_VERSION, session.frame, session.seed, session.current_level,
+                        STATES.index(session.state), session.score, session.lives, len(balls),
+                        len(session.power_ups), len(session.lasers), len(alive), count)]
+
+    version, words, gauss_next = session.rng.getstate()
+    parts.append(_RNG.pack(*words))
+    parts.append(_GAUSS.pack(gauss_next is not None, gauss_next or 0.0))
+    effects_state = particles.rng.bit_generator.state
+    parts.append(_EFFECTS_RNG.pack(effects_state['state']['state'].to_bytes(16, 'little'),
+                                   effects_state['state']['inc'].to_bytes(16, 'little'),
+                                   effects_state['has_uint32'], effects_state['uinteger']))
+
+    parts.append(_PADDLE.pack(*paddle.rect, paddle.width, *paddle.prev_position,
+                              paddle.has_laser, paddle.has_glue, paddle.has_shrink,
+                              *(paddle.power_up_ends[name] for name in PADDLE_POWER_UPS)))
+    for ball in balls:
+        parts.append(_BALL.pack(*ball.rect, *ball.prev_position, ball.speed_x, ball.speed_y,
+                                ball.is_glued, ball.is_slowed, ball.is_fast, ball.is_strong,
+                                *(ball.power_up_ends[name] for name in BALL_POWER_UPS)))
+    for power_up in session.power_ups:
+        parts.append(_POWER_UP.pack(POWER_UP_NAMES.index(power_up.type), *power_up.rect.topleft,
+                                    *power_up.prev_position))
+    for laser in session.lasers:
+        parts.append(_LASER.pack(*laser.rect.topleft, *laser.prev_position))
+    parts.append(bytes(alive))
+
+    for name in PARTICLE_FIELDS:
+        parts.append(getattr(particles, name)[:count].tobytes())
+    parts.append(particles.color[:count].tobytes())
+    return b''.join(parts)
+
+
+def restore_snapshot(session, data):
+    # The session must have been created with the same screen size and
+    # collision mode as the one the snapshot was taken from. A malformed
+    # snapshot raises ValueError before anything is changed.
+    head, rng_state, effects_state = _check_snapshot(data)
+    (version, frame, seed, level, state, score, lives, ball_count, power_up_count,
+     laser_count, brick_count, particle_count) = head
+    offset = _HEAD.size + _RNG.size + _GAUSS.size + _EFFECTS_RNG.size
+    bricks_level = session.current_level  # The level the current brick layout belongs to
+    session.frame = frame
+    session.seed = seed
+    session.current_level = level
+    session.state = STATES[state]
+    session.score = score
+    session.lives = lives
+
+    paddle = session.paddle
+    values = _PADDLE.unpack_from(data, offset)
+    offset += _PADDLE.size
+    paddle.rect = pygame.Rect(values[0:4])
+    paddle.width = values[4]
+    paddle.prev_position = values[5:7]
+    paddle.has_laser, paddle.has_glue, paddle.has_shrink = values[7:10]
+    paddle.power_up_ends = dict(zip(PADDLE_POWER_UPS, values[10:14]))
+
+    balls = []
+    for i in range(ball_count):
+        ball = session.ball if i == 0 else Ball(session.screen_width, session.screen_height, session.rng)
+        values = _BALL.unpack_from(data, offset)
+        offset += _BALL.size
+        ball.rect = pygame.Rect(values[0:4])
+        ball.prev_position = values[4:6]
+        ball.speed_x, ball.speed_y = values[6:8]
+        ball.is_glued, ball.is_slowed, ball.is_fast, ball.is_strong = values[8:12]
+        ball.power_up_ends = dict(zip(BALL_POWER_UPS, values[12:15]))
+        balls.append(ball)
+    session.additional_balls = balls[1:]
+
+    session.power_ups = []
+    for _ in range(power_up_count):
+        type_index, x, y, prev_x, prev_y = _POWER_UP.unpack_from(data, offset)
+        offset += _POWER_UP.size
+        power_up = PowerUp(x, y, POWER_UP_NAMES[type_index])
+        power_up.prev_position = (prev_x, prev_y)
+        session.power_ups.append(power_up)
+
+    session.lasers = []
+    for _ in range(laser_count):
+        x, y, prev_x, prev_y = _LASER.unpack_from(data, offset)
+        offset += _LASER.size
+        laser = Laser(x, y)
+        laser.prev_position = (prev_x, prev_y)
+        session.lasers.append(laser)
+
+    alive = bytearray(data[offset:offset + brick_count])
+    offset += brick_count
+    if level == bricks_level and len(session.bricks.xs) == brick_count:
+        layout, grid = session.bricks, session.brick_grid
+    else:
+        layout, grid = _level_layout(level)
+    store = BrickStore(layout.xs, layout.ys, layout.widths, layout.heights, layout.color_ids,
+                       layout.palette, alive, alive.count(1))
+    session.load_bricks(store, grid.with_store(store))
+
+    particles = session.particles
+    particles.clear()
+    if particle_count > particles.capacity:
+        particles._allocate(particle_count)
+    for name in PARTICLE_FIELDS:
+        size = particle_count * 4
+        getattr(particles, name)[:particle_count] = np.frombuffer(data, np.float32, particle_count, offset)
+        offset += size
+    particles.color[:particle_count] = np.frombuffer(data, np.uint8, particle_count * 3, offset).reshape(-1, 3)
+    particles.count = particle_count
+
+    session.timers.rebuild([paddle] + balls)
+    # Last, creating the extra balls above draws from the RNG
+    session.rng.setstate(rng_state)
+    particles.rng.bit_generator.state = effects_state
+
+
+def read_header(data):
+    # (frame, seed, level, state, score, lives) without restoring anything
+    frame, seed, level, state, score, lives = _check_snapshot(data)[0][1:7]
+    return frame, seed, level, STATES[state], score, lives
+
+
+def split_snapshot(data):
+    # Cut a snapshot into (rest, Mersenne Twister words, killed bricks): the
+    # parts that often stay the same from one save to the next are kept
+    # apart so callers can share them, and bricks are stored as the indices
+    # of the ones destroyed since the level was built
+    head = _check_snapshot(data)[0]
+    rng_end = _HEAD.size + _RNG.size
+    bricks_start = _bricks_offset(head)
+    alive = data[bricks_start:bricks_start + head[10]]
+    killed = array('H', [i for i, is_alive in enumerate(alive) if not is_alive]).tobytes()
+    rest = data[:_HEAD.size] + data[rng_end:bricks_start] + data[bricks_start + head[10]:]
+    return rest, data[_HEAD.size:rng_end], killed
+
+
+def join_snapshot(rest, rng_words, killed):
+    # The snapshot split_snapshot was given
+    head = _HEAD.unpack_from(rest)
+    bricks_start = _bricks_offset(head) - _RNG.size
+    alive = bytearray(b'\x01' * head[10])
+    for i in array('H', killed):
+        alive[i] = 0
+    return b''.join((rest[:_HEAD.size], rng_words, rest[_HEAD.size:bricks_start], alive,
+                     rest[bricks_start:]))
+
+
+def _check_snapshot(data):
+    # The header and the two generator states of a snapshot whose size,
+    # counts, indices and states all make sense, or ValueError
+    if len(data) < _HEAD.size:
+        raise ValueError("Snapshot is truncated")
+    head = _HEAD.unpack_from(data)
+    version, level, state, ball_count, power_up_count = head[0], head[3], head[4], head[7], head[8]
+    brick_count, particle_count = head[10], head[11]
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    if level >= len(LEVELS) or state >= len(STATES) or ball_count == 0:
+        raise ValueError("Snapshot is corrupt")
+    bricks_start = _bricks_offset(head)
+    size = bricks_start + brick_count + particle_count * (4 * len(PARTICLE_FIELDS) + 3)
+    if len(data) != size:
+        raise ValueError("Snapshot is truncated" if len(data) < size else "Snapshot is corrupt")
+    offset = bricks_start - head[9] * _LASER.size - power_up_count * _POWER_UP.size
+    for _ in range(power_up_count):
+        if data[offset] >= len(POWER_UP_NAMES):
+            raise ValueError("Snapshot is corrupt")
+        offset += _POWER_UP.size
+    if (brick_count != len(_level_layout(level)[0].xs) or
+            bytes(data[bricks_start:bricks_start + brick_count]).translate(None, b'\x00\x01')):
+        raise ValueError("Snapshot is corrupt")
+    # Both generators must take their states, or restoring would fail halfway
+    try:
+        rng_state, effects_state = _rng_states(data)
+        _RNG_CHECK.setstate(rng_state)
+        _EFFECTS_RNG_CHECK.state = effects_state
+    except (ValueError, TypeError, OverflowError):
+        raise ValueError("Snapshot is corrupt")
+    return head, rng_state, effects_state
+
+
+def _rng_states(data):
+    # The game's random.Random state and the effects' PCG64 state
+    offset = _HEAD.size
+    rng_words = _RNG.unpack_from(data, offset)
+    has_gauss, gauss_next = _GAUSS.unpack_from(data, offset + _RNG.size)
+    state, inc, has_uint32, uinteger = _EFFECTS_RNG.unpack_from(data, offset + _RNG.size + _GAUSS.size)
+    effects_state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(state, 'little'), 'inc': int.from_bytes(inc, 'little')},
+        'has_uint32': has_uint32,
+        'uinteger': uinteger,
+    }
+    return (3, rng_words, gauss_next if has_gauss else None), effects_state
+
+
+def _bricks_offset(head):
+    ball_count, power_up_count, laser_count = head[7:10]
+    return (_HEAD.size + _RNG.size + _GAUSS.size + _EFFECTS_RNG.size + _PADDLE.size +
+            ball_count * _BALL.size + power_up_count * _POWER_UP.size + laser_count * _LASER.size)
+
+
+def _level_layout(level):
+    layout = _LEVEL_LAYOUTS.get(level)
+    if layout is None:
+        store = BrickStore.from_bricks(build_level(level))
+        layout = _LEVEL_LAYOUTS[level] = (store, BrickGrid(store))
+    return layout
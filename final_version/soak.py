@@ -0,0 +1,105 @@
+import random
+import sys
+import time
+from collections import namedtuple
+from game_session import GameSession, FrameInput
+
+# -- Headless soak runs --
+# Plays games with no window as fast as possible to shake out crashes and
+# nondeterminism. Ball.update only ever negates speed_x / speed_y, so a ball
+# can settle into an orbit that never reaches another brick and the game
+# would go on forever; LoopDetector spots that from GameSession.state_hash()
+# so such games are stopped instead of burning CPU.
+SoakResult = namedtuple('SoakResult', ['frames', 'outcome', 'state_hash'])
+
+
+class LoopDetector:
+    # Feed it the session after every tick. update() returns True once the
+    # balls have gone through the same cycle of positions twice while
+    # nothing else changed (no brick hit, no life lost, no power-up
+    # pending). The paddle is left out of the hash: where it is only decides
+    # whether a ball bounces, so a paddle that keeps catching the ball can't
+    # get it out of its orbit.
+    #
+    # Orbits can be thousands of ticks long, so rather than remembering
+    # every hash this uses Brent's cycle detection: one remembered hash,
+    # moved to the current tick every time the number of ticks since it
+    # reaches a power of two, and compared with every new hash.
+    def __init__(self):
+        self.progress = None
+        self.reset()
+
+    def reset(self):
+        self.remembered = None
+        self.power = 1
+        self.distance = 0  # Ticks since the remembered hash
+        self.period = None  # Distance of the last match, confirmed by another
+
+    def update(self, session):
+        progress = (session.current_level, session.bricks.live_count, session.score, session.lives)
+        if progress != self.progress:
+            self.progress = progress
+            self.reset()
+        # A glued ball is waiting for input and a pending power-up will
+        # change the speed or paddle, neither is a loop
+        if session.timers.next_tick() is not None or any(ball.is_glued for ball in session.balls()):
+            self.reset()
+            return False
+
+        h = session.state_hash(paddle=False)
+        self.distance += 1
+        if h == self.remembered:
+            # A second match a whole number of periods on rules out a
+            # hash collision
+            if self.period is not None and self.distance % self.period == 0:
+                return True
+            self.period = self.distance
+        if self.distance == self.power:
+            self.remembered = h
+            self.power *= 2
+            self.distance = 0
+        return False
+
+
+def run_soak(session, next_input, max_frames, detector=None):
+    # Step the session with next_input(session) until the game ends, loops
+    # or max_frames pass. outcome is the session's state, 'looping' or
+    # 'timeout'; state_hash tells whether two runs ended up the same.
+    detector = detector if detector is not None else LoopDetector()
+    frames = 0
+    outcome = 'timeout'
+    while frames < max_frames:
+        session.step(next_input(session))
+        frames += 1
+        if session.state != 'playing':
+            outcome = session.state
+            break
+        if detector.update(session):
+            outcome = 'looping'
+            break
+    return SoakResult(frames, outcome, session.state_hash())
+
+
+def tracking_player(seed):
+    # Inputs of a simple bot that follows the ball and launches it and
+    # fires at random
+    rng = random.Random(seed)
+
+    def next_input(session):
+        ball_x = session.ball.rect.centerx
+        paddle_x = session.paddle.rect.centerx
+        return FrameInput(ball_x < paddle_x - 10, ball_x > paddle_x + 10,
+                          rng.random() < 0.05, rng.random() < 0.05)
+    return next_input
+
+
+if __name__ == '__main__':
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    max_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 60 * 60 * 10
+    for seed in range(games):
+        start = time.perf_counter()
+        session = GameSession(effects=False, seed=seed)
+        result = run_soak(session, tracking_player(seed), max_frames)
+        elapsed = time.perf_counter() - start
+        print(f"seed {seed}: {result.outcome} after {result.frames} ticks in {elapsed:.2f}s, "
+              f"level {session.current_level + 1}, score {session.score}, hash {result.state_hash:08x}")